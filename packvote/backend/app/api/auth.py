@@ -2,6 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import Any
+from cachetools import TTLCache
+from jose import jwt
+import hashlib
+import threading
+import time
+import uuid
 
 from ..schemas.user import UserCreate, UserLogin, TokenResponse, UserResponse, UserUpdate
 from ..services.auth import AuthService
@@ -12,25 +18,71 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(
+# Verified tokens -> (User, expires_at). Keyed by SHA-256 of the raw token so
+# the bearer secret itself is never held in memory longer than the request.
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
+
+
+def invalidate_cached_user(user_id: uuid.UUID) -> None:
+    """Drop every cached token entry that resolves to the given user."""
+    with _token_cache_lock:
+        stale_keys = [key for key, (user, _) in _token_cache.items() if user.id == user_id]
+        for key in stale_keys:
+            _token_cache.pop(key, None)
+
+
+def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
+    """
+    Dependency providing the request's AuthService.
+
+    FastAPI caches dependencies per request, so every dependency and handler
+    in one request shares this instance and its access decisions.
+    """
+    return AuthService(db)
+
+
+def get_current_user(
     token: str = Depends(oauth2_scheme),
+    auth_service: AuthService = Depends(get_auth_service),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Dependency to get the current authenticated user.
+
+    Successful lookups are cached for a few seconds (never past the token's
+    own expiry) to skip repeated JWT verification and user queries. The
+    cached instance stays detached and is never handed out; each request
+    gets its own copy attached to its session.
     """
-    auth_service = AuthService(db)
-    return auth_service.get_current_user(token)
+    cache_key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+    if cached is None or cached[1] <= now:
+        user = auth_service.get_current_user(token)
+
+        # Detach so the cached instance is not expired by this session's commits
+        db.expunge(user)
+
+        token_exp = jwt.get_unverified_claims(token).get("exp", now)
+        cached = (user, min(now + TOKEN_CACHE_TTL_SECONDS, token_exp))
+        with _token_cache_lock:
+            _token_cache[cache_key] = cached
+
+    # Copy the loaded state into this session without a query
+    return db.merge(cached[0], load=False)
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-async def register(
+def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """
     Register a new user.
     """
-    auth_service = AuthService(db)
     return auth_service.register_user(
         email=user_data.email,
         name=user_data.name,
@@ -39,28 +91,26 @@ async def register(
     )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(
+def login(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """
     Login with email and password (JSON).
     """
-    auth_service = AuthService(db)
     return auth_service.authenticate_user(
         email=login_data.email,
         password=login_data.password
     )
 
 @router.post("/token", response_model=TokenResponse)
-async def login_form(
+def login_form(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """
     Login with form data (compatible with Swagger UI).
     """
-    auth_service = AuthService(db)
     return auth_service.authenticate_user(
         email=form_data.username,  # OAuth2 form uses 'username' field
         password=form_data.password
@@ -76,19 +126,20 @@ async def read_users_me(
     return current_user
 
 @router.put("/me", response_model=UserResponse)
-async def update_users_me(
+def update_users_me(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """
     Update current user profile.
     """
-    auth_service = AuthService(db)
-    return auth_service.update_user_profile(
-        user_id=str(current_user.id),
+    updated_user = auth_service.update_user_profile(
+        user_id=current_user.id_str,
         name=user_update.name,
         telegram_id=user_update.telegram_id,
         location=user_update.location,
         preferred_currency=user_update.preferred_currency
     )
+    invalidate_cached_user(current_user.id)
+    return updated_user
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from pydantic import BaseModel
-from datetime import datetime
 import logging
+import uuid
 
 from ..utils.database import get_db
 from .auth import get_current_user
+from .trips import invalidate_cached_trip, invalidate_cached_trip_lists
 from ..models.trip import Trip
 from ..models.participant import Participant, ParticipantRole as ParticipantRoleModel, ParticipantStatus as ParticipantStatusModel
 
@@ -14,63 +17,55 @@ logger = logging.getLogger(__name__)
 
 class JoinTripResponse(BaseModel):
     message: str
-    trip_id: str
+    trip_id: uuid.UUID
     trip_title: str
 
 @router.post("/join/{invite_code}", response_model=JoinTripResponse)
-async def join_trip_by_code(
+def join_trip_by_code(
     invite_code: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Join a trip using an invite code"""
-    try:
-        # Find trip by invite code
-        trip = db.query(Trip).filter(Trip.invite_code == invite_code).first()
-        
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Invalid invite code"
-            )
-        
-        # Check if user is already a participant
-        existing_participant = db.query(Participant).filter(
-            Participant.trip_id == trip.id,
-            Participant.user_id == str(current_user.id)
-        ).first()
-        
-        if existing_participant:
-            return JoinTripResponse(
-                message="You are already a participant in this trip",
-                trip_id=str(trip.id),
-                trip_title=trip.title
-            )
-        
-        # Add user as participant
-        new_participant = Participant(
-            trip_id=str(trip.id),
-            user_id=str(current_user.id),
-            role=ParticipantRoleModel.member,
-            status=ParticipantStatusModel.joined,
-            joined_at=datetime.utcnow()
+    # Find trip by invite code
+    trip = db.query(Trip).options(
+        load_only(Trip.id, Trip.title)
+    ).filter(Trip.invite_code == invite_code).one_or_none()
+    
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid invite code"
         )
-        
-        db.add(new_participant)
-        db.commit()
-        
+    
+    # Add user as participant; the unique (trip_id, user_id) constraint
+    # turns an existing membership into a no-op instead of a second row
+    stmt = pg_insert(Participant).values(
+        trip_id=trip.id,
+        user_id=current_user.id,
+        role=ParticipantRoleModel.member,
+        status=ParticipantStatusModel.joined,
+        joined_at=func.now()
+    ).on_conflict_do_nothing(
+        index_elements=[Participant.trip_id, Participant.user_id]
+    ).returning(Participant.id)
+    new_participant_id = db.execute(stmt).scalar_one_or_none()
+
+    if new_participant_id is None:
         return JoinTripResponse(
-            message="Successfully joined the trip!",
-            trip_id=str(trip.id),
+            message="You are already a participant in this trip",
+            trip_id=trip.id,
             trip_title=trip.title
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error joining trip: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to join trip"
-        )
+
+    # Build the response before commit expires the loaded trip
+    join_response = JoinTripResponse(
+        message="Successfully joined the trip!",
+        trip_id=trip.id,
+        trip_title=trip.title
+    )
+    db.commit()
+    invalidate_cached_trip(join_response.trip_id)
+    invalidate_cached_trip_lists(trip_id=join_response.trip_id, user_id=current_user.id)
+
+    return join_response
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, func, update
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Dict, Any
-from datetime import datetime
-import uuid
+import re
 
 from ..schemas.preference import (
     PreferenceCreate, PreferenceUpdate, PreferenceResponse, SurveyResponse,
     CompleteSurveyRequest, PreferenceType
 )
 from ..services.auth import AuthService
-from ..models import Preference, User
+from ..models import Preference
 from ..utils.database import get_db
 from ..api.auth import get_current_user
 import logging
@@ -18,6 +20,13 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/trips/{trip_id}/preferences", tags=["preferences"])
 
+# Cheap format check for path IDs; avoids building a uuid.UUID just to validate
+_UUID_RE = re.compile(r'\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
+
+# Preference type values in declaration order and by key, resolved once at import
+_PREF_TYPE_VALUES = tuple(pref_type.value for pref_type in PreferenceType)
+_PREF_TYPE_BY_KEY = {pref_type.value: pref_type for pref_type in PreferenceType}
+
 
 def validate_access(trip_id: str, current_user, db: Session) -> bool:
     """Validate user has access to trip preferences"""
@@ -29,138 +38,93 @@ def validate_access(trip_id: str, current_user, db: Session) -> bool:
 
 
 @router.get("/", response_model=List[PreferenceResponse])
-async def get_trip_preferences(
+def get_trip_preferences(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all preferences for a trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get preferences with user names
-        preferences = db.query(Preference, User).join(
-            User, Preference.user_id == User.id
-        ).filter(Preference.trip_id == trip_id).all()
-
-        preference_responses = []
-        for preference, user in preferences:
-            preference_response = PreferenceResponse(
-                id=str(preference.id),
-                trip_id=str(preference.trip_id),
-                user_id=str(preference.user_id),
-                preference_type=preference.preference_type.value,
-                preference_data=preference.preference_data,
-                created_at=preference.created_at,
-                updated_at=preference.updated_at,
-                user_name=user.name
-            )
-            preference_responses.append(preference_response)
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        return preference_responses
+    # Get preferences with user names, checking access in the same query
+    preferences = db.query(Preference).options(
+        undefer(Preference.user_name)
+    ).filter(
+        Preference.trip_id == trip_id,
+        AuthService.trip_access_clause(current_user, trip_id, "member")
+    ).all()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting trip preferences: {str(e)}")
+    # No rows means either no preferences yet or no access
+    if not preferences and not validate_access(trip_id, current_user, db):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve preferences"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
+    return [PreferenceResponse.model_validate(preference) for preference in preferences]
+
 
 @router.post("/", response_model=PreferenceResponse, status_code=status.HTTP_201_CREATED)
-async def create_preference(
+def create_preference(
     trip_id: str,
     preference_data: PreferenceCreate,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create or update a preference for the trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Check if preference already exists for this user and type
-        existing_preference = db.query(Preference).filter(
-            Preference.trip_id == trip_id,
-            Preference.user_id == str(current_user.id),
-            Preference.preference_type == preference_data.preference_type
-        ).first()
+    # Check access
+    if not validate_access(trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        if existing_preference:
-            # Update existing preference
-            existing_preference.preference_data = preference_data.preference_data
-            existing_preference.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(existing_preference)
-            preference = existing_preference
-        else:
-            # Create new preference
-            new_preference = Preference(
-                trip_id=trip_id,
-                user_id=str(current_user.id),
-                preference_type=preference_data.preference_type,
-                preference_data=preference_data.preference_data
-            )
-            db.add(new_preference)
-            db.commit()
-            db.refresh(new_preference)
-            preference = new_preference
-
-        preference_response = PreferenceResponse(
-            id=str(preference.id),
-            trip_id=str(preference.trip_id),
-            user_id=str(preference.user_id),
-            preference_type=preference.preference_type.value,
-            preference_data=preference.preference_data,
-            created_at=preference.created_at,
-            updated_at=preference.updated_at,
-            user_name=current_user.name
+    # Check if preference already exists for this user and type
+    existing_preference = db.query(Preference).filter(
+        Preference.trip_id == trip_id,
+        Preference.user_id == current_user.id,
+        Preference.preference_type == preference_data.preference_type
+    ).first()
+
+    if existing_preference:
+        # Update existing preference
+        existing_preference.preference_data = preference_data.preference_data
+        preference = existing_preference
+    else:
+        # Create new preference
+        new_preference = Preference(
+            trip_id=trip_id,
+            user_id=current_user.id,
+            preference_type=preference_data.preference_type,
+            preference_data=preference_data.preference_data
         )
+        db.add(new_preference)
+        preference = new_preference
 
-        return preference_response
+    # Flush so RETURNING fills in the DB timestamps, and build the
+    # response before commit expires the instance
+    db.flush()
+    set_committed_value(preference, "user_name", current_user.name)
+    preference_response = PreferenceResponse.model_validate(preference)
+    db.commit()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error creating preference: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create preference"
-        )
+    return preference_response
 
 
 @router.put("/{preference_id}", response_model=PreferenceResponse)
-async def update_preference(
+def update_preference(
     trip_id: str,
     preference_id: str,
     preference_update: PreferenceUpdate,
@@ -168,247 +132,186 @@ async def update_preference(
     db: Session = Depends(get_db)
 ):
     """Update a preference"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(preference_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Preference not found"
-            )
+    # Validate UUIDs
+    if not (_UUID_RE.match(trip_id) and _UUID_RE.match(preference_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preference not found"
+        )
 
-        # Get preference
-        preference = db.query(Preference).filter(
-            Preference.id == preference_id,
-            Preference.trip_id == trip_id,
-            Preference.user_id == str(current_user.id)
+    # Update the caller's own preference in one statement, with the access
+    # check in its WHERE clause; a PUT with no data only reads the row back
+    filters = (
+        Preference.id == preference_id,
+        Preference.trip_id == trip_id,
+        Preference.user_id == current_user.id,
+        AuthService.trip_access_clause(current_user, trip_id, "member")
+    )
+    changes = preference_update.model_dump(exclude_none=True)
+    if changes:
+        preference = db.scalars(
+            update(Preference).where(*filters).values(**changes).returning(Preference)
         ).first()
+    else:
+        preference = db.query(Preference).filter(*filters).first()
 
-        if not preference:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Preference not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
+    # No row means either no such preference or no access
+    if not preference:
+        owns_preference = db.query(exists().where(
+            Preference.id == preference_id,
+            Preference.trip_id == trip_id,
+            Preference.user_id == current_user.id
+        )).scalar()
+        if owns_preference:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied to this trip"
             )
-
-        # Update preference
-        if preference_update.preference_data is not None:
-            preference.preference_data = preference_update.preference_data
-            preference.updated_at = datetime.utcnow()
-
-        db.commit()
-        db.refresh(preference)
-
-        preference_response = PreferenceResponse(
-            id=str(preference.id),
-            trip_id=str(preference.trip_id),
-            user_id=str(preference.user_id),
-            preference_type=preference.preference_type.value,
-            preference_data=preference.preference_data,
-            created_at=preference.created_at,
-            updated_at=preference.updated_at,
-            user_name=current_user.name
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preference not found"
         )
 
-        return preference_response
+    set_committed_value(preference, "user_name", current_user.name)
+    preference_response = PreferenceResponse.model_validate(preference)
+    db.commit()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating preference: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update preference"
-        )
+    return preference_response
 
 
 @router.get("/survey", response_model=SurveyResponse)
-async def get_my_survey(
+def get_my_survey(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's preference survey for a trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Check access
+    if not validate_access(trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        # Get user's preferences
-        user_preferences = db.query(Preference).filter(
-            Preference.trip_id == trip_id,
-            Preference.user_id == str(current_user.id)
-        ).all()
+    # Get user's preferences
+    user_preferences = db.query(Preference).options(
+        undefer(Preference.user_name)
+    ).filter(
+        Preference.trip_id == trip_id,
+        Preference.user_id == current_user.id
+    ).all()
 
-        preference_responses = []
-        completion_status = {}
-
-        # Check completion for each preference type
-        for pref_type in PreferenceType:
-            completion_status[pref_type.value] = False
-
-        for preference in user_preferences:
-            preference_response = PreferenceResponse(
-                id=str(preference.id),
-                trip_id=str(preference.trip_id),
-                user_id=str(preference.user_id),
-                preference_type=preference.preference_type.value,
-                preference_data=preference.preference_data,
-                created_at=preference.created_at,
-                updated_at=preference.updated_at,
-                user_name=current_user.name
-            )
-            preference_responses.append(preference_response)
-            completion_status[preference.preference_type.value] = True
+    preference_responses = []
 
-        overall_complete = all(completion_status.values())
+    # Check completion for each preference type
+    completion_status = dict.fromkeys(_PREF_TYPE_VALUES, False)
 
-        survey_response = SurveyResponse(
-            trip_id=trip_id,
-            user_preferences=preference_responses,
-            completion_status=completion_status,
-            overall_complete=overall_complete
-        )
+    for preference in user_preferences:
+        preference_response = PreferenceResponse.model_validate(preference)
+        preference_responses.append(preference_response)
+        completion_status[preference.preference_type.value] = True
 
-        return survey_response
+    overall_complete = all(completion_status.values())
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting survey: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve survey"
-        )
+    survey_response = SurveyResponse(
+        trip_id=trip_id,
+        user_preferences=preference_responses,
+        completion_status=completion_status,
+        overall_complete=overall_complete
+    )
+
+    return survey_response
 
 
 @router.post("/survey", response_model=SurveyResponse)
-async def complete_survey(
+def complete_survey(
     trip_id: str,
     survey_data: CompleteSurveyRequest,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Complete or update preference survey in bulk"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Check access
+    if not validate_access(trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        logger.info(f"Received survey completion request for trip {trip_id} from user {current_user.id}")
-        logger.info(f"Survey data keys: {survey_data.model_dump().keys()}")
+    logger.info("Received survey completion request for trip %s from user %s", trip_id, current_user.id)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Survey data keys: %s", sorted(survey_data.model_fields_set))
+
+    created_preferences = []
+
+    # Process each preference type
+    preference_mappings = {
+        "budget": survey_data.budget,
+        "dates": survey_data.dates,
+        "activities": survey_data.activities,
+        "accommodation": survey_data.accommodation,
+        "transportation": survey_data.transportation,
+        "vibe": survey_data.vibe,
+        "detailed": survey_data.detailed
+    }
+
+    # Upsert every submitted preference type in a single statement
+    rows = [
+        {
+            "trip_id": trip_id,
+            "user_id": current_user.id,
+            "preference_type": _PREF_TYPE_BY_KEY[pref_type_str],
+            "preference_data": pref_data.model_dump()
+        }
+        for pref_type_str, pref_data in preference_mappings.items()
+        if pref_data is not None
+    ]
+
+    if rows:
+        stmt = pg_insert(Preference).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Preference.trip_id, Preference.user_id, Preference.preference_type],
+            set_={
+                "preference_data": stmt.excluded.preference_data,
+                "updated_at": func.now()
+            }
+        ).returning(Preference)
+        saved_preferences = db.scalars(
+            stmt, execution_options={"populate_existing": True}
+        ).all()
 
-        created_preferences = []
+        for preference in saved_preferences:
+            set_committed_value(preference, "user_name", current_user.name)
+            preference_response = PreferenceResponse.model_validate(preference)
+            created_preferences.append(preference_response)
+        db.commit()
 
-        # Process each preference type
-        preference_mappings = {
-            "budget": survey_data.budget,
-            "dates": survey_data.dates,
-            "activities": survey_data.activities,
-            "accommodation": survey_data.accommodation,
-            "transportation": survey_data.transportation,
-            "vibe": survey_data.vibe,
-            "detailed": survey_data.detailed
-        }
+    # Return updated survey status
+    completion_status = {}
+    for pref_type_str in preference_mappings.keys():
+        completion_status[pref_type_str] = preference_mappings[pref_type_str] is not None
 
-        for pref_type_str, pref_data in preference_mappings.items():
-            if pref_data is not None:
-                preference_type = PreferenceType(pref_type_str)
-
-                # Check if preference already exists
-                existing_preference = db.query(Preference).filter(
-                    Preference.trip_id == trip_id,
-                    Preference.user_id == str(current_user.id),
-                    Preference.preference_type == preference_type
-                ).first()
-
-                pref_data_dict = pref_data.model_dump()
-
-                if existing_preference:
-                    # Update existing
-                    existing_preference.preference_data = pref_data_dict
-                    existing_preference.updated_at = datetime.utcnow()
-                    preference = existing_preference
-                else:
-                    # Create new
-                    preference = Preference(
-                        trip_id=trip_id,
-                        user_id=str(current_user.id),
-                        preference_type=preference_type,
-                        preference_data=pref_data_dict
-                    )
-                    db.add(preference)
-
-                db.commit()
-                db.refresh(preference)
-
-                preference_response = PreferenceResponse(
-                    id=str(preference.id),
-                    trip_id=str(preference.trip_id),
-                    user_id=str(preference.user_id),
-                    preference_type=preference.preference_type.value,
-                    preference_data=preference.preference_data,
-                    created_at=preference.created_at,
-                    updated_at=preference.updated_at,
-                    user_name=current_user.name
-                )
-                created_preferences.append(preference_response)
-
-        # Return updated survey status
-        completion_status = {}
-        for pref_type_str in preference_mappings.keys():
-            completion_status[pref_type_str] = preference_mappings[pref_type_str] is not None
-
-        overall_complete = all(completion_status.values())
-
-        survey_response = SurveyResponse(
-            trip_id=trip_id,
-            user_preferences=created_preferences,
-            completion_status=completion_status,
-            overall_complete=overall_complete
-        )
+    overall_complete = all(completion_status.values())
 
-        return survey_response
+    survey_response = SurveyResponse(
+        trip_id=trip_id,
+        user_preferences=created_preferences,
+        completion_status=completion_status,
+        overall_complete=overall_complete
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error completing survey: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to complete survey"
-        )
\ No newline at end of file
+    return survey_response
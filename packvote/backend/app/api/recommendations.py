@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
+from cachetools import TTLCache
+import asyncio
+import orjson
+import threading
 import uuid
 
-from ..schemas.recommendation import RecommendationCreate, RecommendationResponse, GenerateRecommendationsResponse, RecommendationUpdate
+from ..schemas.recommendation import RecommendationCreate, RecommendationResponse, GenerateRecommendationsResponse, RecommendationUpdate, personalization_from_meta
 from ..services.auth import AuthService
 from ..services.ai_service import AIService
-from ..services.voting import VotingService
+from ..services.voting import VotingService, invalidate_cached_results
 from ..services.unsplash_service import unsplash_service
-from ..models import Recommendation, Trip, Vote
+from ..models import Recommendation, Trip
 from ..utils.database import get_db
 from ..api.auth import get_current_user
 import logging
@@ -18,7 +24,44 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/trips/{trip_id}/recommendations", tags=["recommendations"])
 
 
-def validate_access(trip_id: str, current_user, db: Session) -> bool:
+# Per-trip recommendation lists, shared by every member and personalized
+# per caller on the way out; writes to a trip's recommendations evict it
+RECOMMENDATIONS_CACHE_TTL_SECONDS = 60
+_recommendations_cache = TTLCache(maxsize=1000, ttl=RECOMMENDATIONS_CACHE_TTL_SECONDS)
+_recommendations_cache_lock = threading.Lock()
+
+
+def invalidate_cached_recommendations(trip_id) -> None:
+    """Drop the cached recommendation list for a trip"""
+    with _recommendations_cache_lock:
+        _recommendations_cache.pop(str(trip_id), None)
+    # Recommendations are the voting candidates, so the tally goes with them
+    invalidate_cached_results(trip_id)
+
+
+# Open /events streams per trip; generation progress is pushed to each of them
+# so clients wait on one stream instead of polling the recommendation list
+GENERATION_EVENTS_KEEPALIVE_SECONDS = 15
+_generation_listeners: Dict[str, Set[asyncio.Queue]] = {}
+
+# Last event of each in-flight generation, replayed to clients that subscribe
+# mid-run; the TTL stops an interrupted generation from being reported forever
+GENERATION_STATUS_TTL_SECONDS = 600
+_generation_status = TTLCache(maxsize=1000, ttl=GENERATION_STATUS_TTL_SECONDS)
+
+
+def publish_generation_event(trip_id, event: Dict[str, Any]) -> None:
+    """Push a generation event to every client listening on the trip"""
+    trip_key = str(trip_id)
+    if event["status"] in ("done", "failed"):
+        _generation_status.pop(trip_key, None)
+    else:
+        _generation_status[trip_key] = event
+    for queue in _generation_listeners.get(trip_key, ()):
+        queue.put_nowait(event)
+
+
+def validate_access(trip_id: uuid.UUID, current_user, db: Session) -> bool:
     """Validate user has access to trip recommendations"""
     try:
         auth_service = AuthService(db)
@@ -28,92 +71,54 @@ def validate_access(trip_id: str, current_user, db: Session) -> bool:
 
 
 @router.get("/", response_model=List[RecommendationResponse])
-async def get_trip_recommendations(
-    trip_id: str,
+def get_trip_recommendations(
+    trip_id: uuid.UUID,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all recommendations for a trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Check access
+    if not validate_access(trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Get recommendations, from cache when another member loaded them recently
+    with _recommendations_cache_lock:
+        cached_recommendations = _recommendations_cache.get(str(trip_id))
 
-        # Get recommendations
+    if cached_recommendations is None:
         recommendations = db.query(Recommendation).filter(
             Recommendation.trip_id == trip_id
         ).order_by(Recommendation.created_at.desc()).all()
-
-        recommendation_responses = []
-        for rec in recommendations:
-            # Check for personalization for current user
-            personalization = None
-            if rec.meta and "personalizations" in rec.meta:
-                user_id = str(current_user.id)
-                if user_id in rec.meta["personalizations"]:
-                    personalization = rec.meta["personalizations"][user_id]
-
-            recommendation_response = RecommendationResponse(
-                id=str(rec.id),
-                trip_id=str(rec.trip_id),
-                destination_name=rec.destination_name,
-                description=rec.description,
-                estimated_cost=float(rec.estimated_cost) if rec.estimated_cost else None,
-                activities=rec.activities,
-                accommodation_options=rec.accommodation_options,
-                transportation_options=rec.meta.get("transportation_options", []) if rec.meta else [],
-                ai_generated=rec.ai_generated,
-                image_url=rec.image_url,
-                created_at=rec.created_at,
-                personalization=personalization,
-                meta=rec.meta
-            )
-            recommendation_responses.append(recommendation_response)
-
-        return recommendation_responses
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting recommendations: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve recommendations"
-        )
+        cached_recommendations = [
+            RecommendationResponse.model_validate(rec) for rec in recommendations
+        ]
+        with _recommendations_cache_lock:
+            _recommendations_cache[str(trip_id)] = cached_recommendations
+
+    # Overlay the caller's personalization on the shared entries
+    user_id = current_user.id_str
+    return [
+        rec.model_copy(update={
+            "personalization": personalization_from_meta(rec.meta, user_id)
+        })
+        for rec in cached_recommendations
+    ]
 
 
 @router.post("/generate", response_model=GenerateRecommendationsResponse)
 async def generate_ai_recommendations(
-    trip_id: str,
+    trip_id: uuid.UUID,
     clear_existing: bool = True,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Generate AI-powered recommendations for the trip"""
     try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
         # Check if user is trip owner or has elevated permissions
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
+        trip = await run_in_threadpool(db.query(Trip.created_by).filter(Trip.id == trip_id).first)
         if not trip:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -121,48 +126,37 @@ async def generate_ai_recommendations(
             )
 
         # Only trip owners can generate recommendations
-        if str(trip.created_by) != str(current_user.id):
+        if trip.created_by != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only trip owners can generate recommendations"
             )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+        publish_generation_event(trip_id, {"status": "started"})
 
         # Clear existing AI recommendations if requested
         if clear_existing:
-            # Step 1: Delete Votes associated with AI recommendations for this trip
-            # We need to find the IDs of recommendations that will be deleted
-            ai_recs_query = db.query(Recommendation.id).filter(
-                Recommendation.trip_id == trip_id,
-                Recommendation.ai_generated == True
+            # Votes go with them via ON DELETE CASCADE on votes.recommendation_id
+            await run_in_threadpool(
+                db.query(Recommendation).filter(
+                    Recommendation.trip_id == trip_id,
+                    Recommendation.ai_generated == True
+                ).delete,
+                synchronize_session=False
             )
-            
-            # Delete votes for these recommendations
-            db.query(Vote).filter(
-                Vote.recommendation_id.in_(ai_recs_query)
-            ).delete(synchronize_session=False)
-
-            # Step 2: Delete the recommendations themselves
-            db.query(Recommendation).filter(
-                Recommendation.trip_id == trip_id,
-                Recommendation.ai_generated == True
-            ).delete(synchronize_session=False)
-            
-            db.commit()
+
+            await run_in_threadpool(db.commit)
+            invalidate_cached_recommendations(trip_id)
 
         # Generate AI recommendations
         ai_service = AIService(db)
         created_recommendations = await ai_service.generate_recommendations(trip_id)
+        invalidate_cached_recommendations(trip_id)
 
         ai_service_available = True  # Track if AI was actually used
         if not created_recommendations:
             logger.warning("No recommendations were generated")
+            publish_generation_event(trip_id, {"status": "done", "count": 0})
             return GenerateRecommendationsResponse(
                 message="No recommendations could be generated. Please check trip preferences.",
                 recommendations_generated=0,
@@ -171,7 +165,9 @@ async def generate_ai_recommendations(
 
         # Reset voting session since new recommendations are available
         voting_service = VotingService(db)
-        voting_service.reset_votes(trip_id)
+        await run_in_threadpool(voting_service.reset_votes, trip_id)
+
+        publish_generation_event(trip_id, {"status": "done", "count": len(created_recommendations)})
 
         return GenerateRecommendationsResponse(
             message=f"Successfully generated {len(created_recommendations)} recommendations. Voting session has been reset.",
@@ -181,351 +177,271 @@ async def generate_ai_recommendations(
 
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error generating recommendations: {str(e)}")
+    except Exception:
+        # The global handler logs and answers 500; listeners still need to
+        # hear that the run failed
+        publish_generation_event(trip_id, {"status": "failed"})
+        raise
+
+
+@router.get("/events")
+async def recommendation_generation_events(
+    trip_id: uuid.UUID,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream recommendation generation progress as server-sent events"""
+    # Check access
+    if not await run_in_threadpool(validate_access, trip_id, current_user, db):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to generate recommendations"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
+    # With no generation running there is nothing to wait for, so report
+    # idle and close; otherwise start from the run's latest event
+    current_event = _generation_status.get(str(trip_id))
+    if current_event is None:
+        return StreamingResponse(
+            iter((b"data: " + orjson.dumps({"status": "idle"}) + b"\n\n",)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait(current_event)
+    _generation_listeners.setdefault(str(trip_id), set()).add(queue)
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=GENERATION_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+                if event["status"] in ("done", "failed"):
+                    break
+        finally:
+            listeners = _generation_listeners.get(str(trip_id))
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    _generation_listeners.pop(str(trip_id), None)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 
 @router.post("/", response_model=RecommendationResponse, status_code=status.HTTP_201_CREATED)
 async def create_custom_recommendation(
-    trip_id: str,
+    trip_id: uuid.UUID,
     recommendation_data: RecommendationCreate,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a custom recommendation (not AI-generated)"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check if user is trip owner or has elevated permissions
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check permissions
-        is_owner = str(trip.created_by) == str(current_user.id)
-        
-        if not is_owner and not trip.allow_member_recommendations:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can create recommendations for this trip"
-            )
+    # Check if user is trip owner or has elevated permissions
+    trip = await run_in_threadpool(db.query(Trip.created_by, Trip.allow_member_recommendations).filter(Trip.id == trip_id).first)
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Check permissions
+    is_owner = trip.created_by == current_user.id
 
-        # Create recommendation
-        new_recommendation = Recommendation(
-            trip_id=trip_id,
-            destination_name=recommendation_data.destination_name,
-            description=recommendation_data.description,
-            estimated_cost=recommendation_data.estimated_cost,
-            activities=recommendation_data.activities,
-            accommodation_options=recommendation_data.accommodation_options,
-            meta={"transportation_options": recommendation_data.transportation_options},
-            ai_generated=recommendation_data.ai_generated
+    if not is_owner and not trip.allow_member_recommendations:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can create recommendations for this trip"
         )
 
-        # Fetch image from Unsplash
-        image_url = await unsplash_service.get_photo_url(new_recommendation.destination_name)
-        if image_url:
-            new_recommendation.image_url = image_url
-
-        db.add(new_recommendation)
-        db.commit()
-        db.refresh(new_recommendation)
-
-        recommendation_response = RecommendationResponse(
-            id=str(new_recommendation.id),
-            trip_id=str(new_recommendation.trip_id),
-            destination_name=new_recommendation.destination_name,
-            description=new_recommendation.description,
-            estimated_cost=float(new_recommendation.estimated_cost) if new_recommendation.estimated_cost else None,
-            activities=new_recommendation.activities,
-            accommodation_options=new_recommendation.accommodation_options,
-            transportation_options=new_recommendation.meta.get("transportation_options", []) if new_recommendation.meta else [],
-            ai_generated=new_recommendation.ai_generated,
-            image_url=new_recommendation.image_url,
-            created_at=new_recommendation.created_at,
-            meta=new_recommendation.meta
+    # Check access (owners always have it, so only members need the lookup)
+    if not is_owner and not await run_in_threadpool(validate_access, trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
-        return recommendation_response
+    # Create recommendation
+    new_recommendation = Recommendation(
+        trip_id=trip_id,
+        destination_name=recommendation_data.destination_name,
+        description=recommendation_data.description,
+        estimated_cost=recommendation_data.estimated_cost,
+        activities=recommendation_data.activities,
+        accommodation_options=recommendation_data.accommodation_options,
+        meta={"transportation_options": recommendation_data.transportation_options},
+        ai_generated=recommendation_data.ai_generated
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error creating recommendation: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create recommendation"
-        )
+    # Fetch image from Unsplash
+    image_url = await unsplash_service.get_photo_url(new_recommendation.destination_name)
+    if image_url:
+        new_recommendation.image_url = image_url
+
+    db.add(new_recommendation)
+    await run_in_threadpool(db.commit)
+    invalidate_cached_recommendations(trip_id)
+    await run_in_threadpool(db.refresh, new_recommendation)
+
+    recommendation_response = RecommendationResponse.model_validate(new_recommendation)
+
+    return recommendation_response
 
 
 @router.get("/{recommendation_id}", response_model=RecommendationResponse)
-async def get_recommendation(
-    trip_id: str,
-    recommendation_id: str,
+def get_recommendation(
+    trip_id: uuid.UUID,
+    recommendation_id: uuid.UUID,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get specific recommendation details"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(recommendation_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get recommendation
-        recommendation = db.query(Recommendation).filter(
-            Recommendation.id == recommendation_id,
-            Recommendation.trip_id == trip_id
-        ).first()
-
-        if not recommendation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
-
-        # Check for personalization for current user
-        personalization = None
-        if recommendation.meta and "personalizations" in recommendation.meta:
-            user_id = str(current_user.id)
-            if user_id in recommendation.meta["personalizations"]:
-                personalization = recommendation.meta["personalizations"][user_id]
-
-        recommendation_response = RecommendationResponse(
-            id=str(recommendation.id),
-            trip_id=str(recommendation.trip_id),
-            destination_name=recommendation.destination_name,
-            description=recommendation.description,
-            estimated_cost=float(recommendation.estimated_cost) if recommendation.estimated_cost else None,
-            activities=recommendation.activities,
-            accommodation_options=recommendation.accommodation_options,
-            transportation_options=recommendation.meta.get("transportation_options", []) if recommendation.meta else [],
-            ai_generated=recommendation.ai_generated,
-            image_url=recommendation.image_url,
-            created_at=recommendation.created_at,
-            personalization=personalization,
-            meta=recommendation.meta
+    # Check access
+    if not validate_access(trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
-        return recommendation_response
+    # Get recommendation
+    recommendation = db.query(Recommendation).filter(
+        Recommendation.id == recommendation_id,
+        Recommendation.trip_id == trip_id
+    ).first()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting recommendation: {str(e)}")
+    if not recommendation:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve recommendation"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
         )
 
+    recommendation_response = RecommendationResponse.model_validate(
+        recommendation, context={"user_id": current_user.id_str}
+    )
+
+    return recommendation_response
+
 
 @router.delete("/{recommendation_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_recommendation(
-    trip_id: str,
-    recommendation_id: str,
+def delete_recommendation(
+    trip_id: uuid.UUID,
+    recommendation_id: uuid.UUID,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a recommendation"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(recommendation_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
-
-        # Check if user is trip owner
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Only trip owners can delete recommendations
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can delete recommendations"
-            )
-
-        # Get recommendation
-        recommendation = db.query(Recommendation).filter(
-            Recommendation.id == recommendation_id,
-            Recommendation.trip_id == trip_id
-        ).first()
-
-        if not recommendation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
+    # Check if user is trip owner
+    trip = db.query(Trip.created_by).filter(Trip.id == trip_id).first()
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Delete recommendation
-        db.delete(recommendation)
-        db.commit()
+    # Only trip owners can delete recommendations
+    if trip.created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can delete recommendations"
+        )
 
-        return
+    # Get recommendation
+    recommendation = db.query(Recommendation).filter(
+        Recommendation.id == recommendation_id,
+        Recommendation.trip_id == trip_id
+    ).first()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting recommendation: {str(e)}")
-        db.rollback()
+    if not recommendation:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete recommendation"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
         )
 
+    # Delete recommendation
+    db.delete(recommendation)
+    db.commit()
+    invalidate_cached_recommendations(trip_id)
+
+    return
+
 
 @router.post("/{recommendation_id}/personalize", response_model=RecommendationResponse)
 async def personalize_recommendation(
-    trip_id: str,
-    recommendation_id: str,
+    trip_id: uuid.UUID,
+    recommendation_id: uuid.UUID,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Generate personalized details for a recommendation based on user location"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(recommendation_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Check access
+    if not await run_in_threadpool(validate_access, trip_id, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        # Get recommendation
-        recommendation = db.query(Recommendation).filter(
+    # Get recommendation
+    recommendation = await run_in_threadpool(
+        db.query(Recommendation).filter(
             Recommendation.id == recommendation_id,
             Recommendation.trip_id == trip_id
-        ).first()
+        ).first
+    )
 
-        if not recommendation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Recommendation not found"
-            )
+    if not recommendation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recommendation not found"
+        )
 
-        # Check if user has location
-        if not current_user.location:
-             # Return without personalization if no location
-             return RecommendationResponse(
-                id=str(recommendation.id),
-                trip_id=str(recommendation.trip_id),
-                destination_name=recommendation.destination_name,
-                description=recommendation.description,
-                estimated_cost=float(recommendation.estimated_cost) if recommendation.estimated_cost else None,
-                activities=recommendation.activities,
-                accommodation_options=recommendation.accommodation_options,
-                transportation_options=recommendation.meta.get("transportation_options", []) if recommendation.meta else [],
-                ai_generated=recommendation.ai_generated,
-                image_url=recommendation.image_url,
-                created_at=recommendation.created_at,
-                personalization=None,
-                meta=recommendation.meta
-            )
+    # Check if user has location
+    if not current_user.location:
+         # Return without personalization if no location
+         return RecommendationResponse.model_validate(recommendation)
 
-        # Generate personalization
-        ai_service = AIService(db)
-        
-        # Determine currency
-        currency = current_user.preferred_currency
-        if not currency:
-            currency_code, _ = ai_service.get_currency_for_location(current_user.location)
-            currency = currency_code
-            
-        personalization_data = await ai_service.generate_personalization(
-            destination=recommendation.destination_name,
-            user_location=current_user.location,
-            currency=currency or "USD"
-        )
+    # Generate personalization
+    ai_service = AIService(db)
 
-        # Store in meta
-        if not recommendation.meta:
-            recommendation.meta = {}
-        
-        recommendation.meta["personalization"] = personalization_data
-
-        # Force update of meta field (SQLAlchemy sometimes misses JSON updates)
-        from sqlalchemy.orm.attributes import flag_modified
-        flag_modified(recommendation, "meta")
-        
-        db.commit()
-        db.refresh(recommendation)
-
-        # Construct response with personalization
-        recommendation_response = RecommendationResponse(
-            id=str(recommendation.id),
-            trip_id=str(recommendation.trip_id),
-            destination_name=recommendation.destination_name,
-            description=recommendation.description,
-            estimated_cost=float(recommendation.estimated_cost) if recommendation.estimated_cost else None,
-            activities=recommendation.activities,
-            accommodation_options=recommendation.accommodation_options,
-            transportation_options=recommendation.meta.get("transportation_options", []) if recommendation.meta else [],
-            ai_generated=recommendation.ai_generated,
-            image_url=recommendation.image_url,
-            created_at=recommendation.created_at,
-            personalization=personalization_data,
-            meta=recommendation.meta
-        )
+    # Determine currency
+    currency = current_user.preferred_currency
+    if not currency:
+        currency_code, _ = ai_service.get_currency_for_location(current_user.location)
+        currency = currency_code
 
-        return recommendation_response
+    personalization_data = await ai_service.generate_personalization(
+        destination=recommendation.destination_name,
+        user_location=current_user.location,
+        currency=currency or "USD"
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error personalizing recommendation: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to personalize recommendation"
-        )
\ No newline at end of file
+    # Store in meta
+    if not recommendation.meta:
+        recommendation.meta = {}
+
+    recommendation.meta["personalization"] = personalization_data
+
+    # Force update of meta field (SQLAlchemy sometimes misses JSON updates)
+    from sqlalchemy.orm.attributes import flag_modified
+    flag_modified(recommendation, "meta")
+
+    await run_in_threadpool(db.commit)
+    invalidate_cached_recommendations(trip_id)
+    await run_in_threadpool(db.refresh, recommendation)
+
+    # Construct response with personalization
+    recommendation_response = RecommendationResponse.model_validate(recommendation)
+    recommendation_response.personalization = personalization_data
+
+    return recommendation_response
\ No newline at end of file
@@ -1,249 +1,247 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from pydantic import BaseModel
+from typing import Optional
+import hmac
 import logging
+import uuid
 
 from ..services.auth import AuthService
 from ..services.telegram_bot import TelegramBotService
 from ..models import User, Participant, Trip
 from ..models.participant import ParticipantStatus
 from ..utils.database import get_db
-from ..api.auth import get_current_user
+from ..api.auth import get_current_user, get_auth_service
+from ..config import settings
 import asyncio
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/telegram", tags=["telegram"])
 
+# Cap concurrent sends to stay under Telegram's global message rate limit
+TELEGRAM_SEND_CONCURRENCY = 20
+
+
+async def send_to_participants(send, users, label: str) -> int:
+    """Run one Telegram send per user concurrently and return how many succeeded"""
+    semaphore = asyncio.Semaphore(TELEGRAM_SEND_CONCURRENCY)
+
+    async def send_one(user):
+        async with semaphore:
+            return await send(user)
+
+    results = await asyncio.gather(*(send_one(user) for user in users), return_exceptions=True)
+
+    sent_count = 0
+    for user, result in zip(users, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error sending {label} to user {user.id}: {str(result)}")
+        elif result:
+            sent_count += 1
+    return sent_count
+
+
+def get_bot_service(request: Request) -> TelegramBotService:
+    """Get the shared bot service created at startup"""
+    return request.app.state.telegram_bot_service
+
 
 @router.post("/webhook")
-async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Telegram bot webhook"""
-    try:
-        # Get webhook data
-        webhook_data = await request.json()
-        logger.info(f"Received Telegram webhook: {webhook_data}")
+async def telegram_webhook(
+    request: Request,
+    bot_service: TelegramBotService = Depends(get_bot_service),
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None)
+):
+    """Queue a Telegram webhook update for the background worker"""
+    # Telegram echoes the secret given to setWebhook on every call
+    if settings.TELEGRAM_WEBHOOK_SECRET and not hmac.compare_digest(
+        x_telegram_bot_api_secret_token or "", settings.TELEGRAM_WEBHOOK_SECRET
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid webhook secret"
+        )
 
-        # Initialize bot service
-        bot_service = TelegramBotService(db)
+    if not bot_service.application:
+        logger.warning("Telegram bot not initialized")
+        return {"status": "error", "message": "Bot not initialized"}
 
-        # Process the update
-        if bot_service.application:
-            update = bot_service.application.update_queue.put(webhook_data)
-            return {"status": "ok"}
-        else:
-            logger.warning("Telegram bot not initialized")
-            return {"status": "error", "message": "Bot not initialized"}
+    try:
+        webhook_data = await request.json()
+        logger.debug("Received Telegram webhook update %s", webhook_data.get("update_id"))
+        request.app.state.telegram_update_queue.put_nowait(webhook_data)
+        return {"status": "ok"}
 
+    except asyncio.QueueFull:
+        # A non-2xx response makes Telegram redeliver the update later
+        logger.warning("Telegram update queue full, deferring update")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Update queue full"
+        )
     except Exception as e:
         logger.error(f"Error processing Telegram webhook: {str(e)}")
         return {"status": "error", "message": str(e)}
 
 
+class TelegramTripRequest(BaseModel):
+    trip_id: uuid.UUID
+
+
 @router.post("/send-survey-invitation")
 async def send_survey_invitation(
-    request_data: Dict[str, Any],
+    request_data: TelegramTripRequest,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    bot_service: TelegramBotService = Depends(get_bot_service)
 ):
     """Send survey invitation to trip participants"""
-    try:
-        trip_id = request_data.get("trip_id")
-        if not trip_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="trip_id is required"
-            )
-
-        # Validate trip ownership
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can send survey invitations"
-            )
-
-        # Get participants with Telegram IDs
-        participants = db.query(Participant, User).join(
+    trip_id = request_data.trip_id
+
+    # Validate trip ownership
+    trip = await run_in_threadpool(db.query(Trip.created_by).filter(Trip.id == trip_id).first)
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+
+    if trip.created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can send survey invitations"
+        )
+
+    # Get participants with Telegram IDs
+    participants = await run_in_threadpool(
+        db.query(Participant, User).join(
             User, Participant.user_id == User.id
         ).filter(
             Participant.trip_id == trip_id,
             Participant.status == ParticipantStatus.joined,
             User.telegram_id.isnot(None)
-        ).all()
-
-        if not participants:
-            return {
-                "message": "No participants with linked Telegram accounts found",
-                "invitations_sent": 0
-            }
-
-        # Initialize bot service
-        bot_service = TelegramBotService(db)
-
-        # Send invitations
-        sent_count = 0
-        for participant, user in participants:
-            try:
-                success = await bot_service.send_survey_invitation(user, trip_id)
-                if success:
-                    sent_count += 1
-            except Exception as e:
-                logger.error(f"Error sending invitation to user {user.id}: {str(e)}")
+        ).all
+    )
 
+    if not participants:
         return {
-            "message": f"Survey invitations sent to {sent_count} participants",
-            "invitations_sent": sent_count,
-            "total_participants": len(participants)
+            "message": "No participants with linked Telegram accounts found",
+            "invitations_sent": 0
         }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error sending survey invitations: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send survey invitations"
-        )
+    # Send invitations
+    sent_count = await send_to_participants(
+        lambda user: bot_service.send_survey_invitation(user, trip_id),
+        [user for _, user in participants],
+        "invitation"
+    )
+
+    return {
+        "message": f"Survey invitations sent to {sent_count} participants",
+        "invitations_sent": sent_count,
+        "total_participants": len(participants)
+    }
 
 
 @router.post("/send-voting-notification")
 async def send_voting_notification(
-    request_data: Dict[str, Any],
+    request_data: TelegramTripRequest,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    bot_service: TelegramBotService = Depends(get_bot_service)
 ):
     """Send voting notification to trip participants"""
-    try:
-        trip_id = request_data.get("trip_id")
-        if not trip_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="trip_id is required"
-            )
-
-        # Validate trip ownership
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can send voting notifications"
-            )
-
-        # Get participants with Telegram IDs
-        participants = db.query(Participant, User).join(
+    trip_id = request_data.trip_id
+
+    # Validate trip ownership
+    trip = await run_in_threadpool(db.query(Trip.created_by, Trip.title).filter(Trip.id == trip_id).first)
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+
+    if trip.created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can send voting notifications"
+        )
+
+    # Get participants with Telegram IDs
+    participants = await run_in_threadpool(
+        db.query(Participant, User).join(
             User, Participant.user_id == User.id
         ).filter(
             Participant.trip_id == trip_id,
             Participant.status == ParticipantStatus.joined,
             User.telegram_id.isnot(None)
-        ).all()
-
-        if not participants:
-            return {
-                "message": "No participants with linked Telegram accounts found",
-                "notifications_sent": 0
-            }
-
-        # Initialize bot service
-        bot_service = TelegramBotService(db)
-
-        # Send notifications
-        sent_count = 0
-        for participant, user in participants:
-            try:
-                success = await bot_service.send_voting_notification(user, trip.title)
-                if success:
-                    sent_count += 1
-            except Exception as e:
-                logger.error(f"Error sending notification to user {user.id}: {str(e)}")
+        ).all
+    )
 
+    if not participants:
         return {
-            "message": f"Voting notifications sent to {sent_count} participants",
-            "notifications_sent": sent_count,
-            "total_participants": len(participants)
+            "message": "No participants with linked Telegram accounts found",
+            "notifications_sent": 0
         }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error sending voting notifications: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send voting notifications"
-        )
+    # Send notifications
+    trip_title = trip.title
+    sent_count = await send_to_participants(
+        lambda user: bot_service.send_voting_notification(user, trip_title),
+        [user for _, user in participants],
+        "notification"
+    )
+
+    return {
+        "message": f"Voting notifications sent to {sent_count} participants",
+        "notifications_sent": sent_count,
+        "total_participants": len(participants)
+    }
 
 
 @router.get("/participants-stats/{trip_id}")
-async def get_telegram_participants_stats(
-    trip_id: str,
+def get_telegram_participants_stats(
+    trip_id: uuid.UUID,
     current_user = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service),
     db: Session = Depends(get_db)
 ):
     """Get statistics about participants with linked Telegram accounts"""
-    try:
-        # Validate trip access
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id, "owner"):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can view participant statistics"
-            )
-
-        # Get all participants
-        all_participants = db.query(Participant, User).join(
-            User, Participant.user_id == User.id
-        ).filter(
-            Participant.trip_id == trip_id,
-            Participant.status == ParticipantStatus.joined
-        ).all()
-
-        # Count participants with and without Telegram
-        with_telegram = 0
-        without_telegram = 0
-
-        for participant, user in all_participants:
-            if user.telegram_id:
-                with_telegram += 1
-            else:
-                without_telegram += 1
-
-        return {
-            "trip_id": trip_id,
-            "total_participants": len(all_participants),
-            "with_telegram": with_telegram,
-            "without_telegram": without_telegram,
-            "telegram_coverage_percentage": (with_telegram / len(all_participants) * 100) if all_participants else 0
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting participant stats: {str(e)}")
+    # Validate trip access
+    if not auth_service.check_trip_access(current_user, trip_id, "owner"):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve participant statistics"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can view participant statistics"
         )
 
+    # Count joined participants with and without Telegram in the database
+    total_participants, with_telegram = db.query(
+        func.count(Participant.id),
+        func.count(func.nullif(User.telegram_id, ""))
+    ).join(
+        User, Participant.user_id == User.id
+    ).filter(
+        Participant.trip_id == trip_id,
+        Participant.status == ParticipantStatus.joined
+    ).one()
+    without_telegram = total_participants - with_telegram
+
+    return {
+        "trip_id": trip_id,
+        "total_participants": total_participants,
+        "with_telegram": with_telegram,
+        "without_telegram": without_telegram,
+        "telegram_coverage_percentage": (with_telegram / total_participants * 100) if total_participants else 0
+    }
+
 
 @router.get("/bot-info")
 async def get_bot_info():
     """Get information about the Telegram bot configuration"""
     try:
-        from ..config import settings
-
         return {
             "bot_configured": bool(settings.TELEGRAM_BOT_TOKEN),
             "webhook_configured": bool(settings.TELEGRAM_WEBHOOK_URL),
@@ -1,24 +1,149 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, raiseload
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
+from cachetools import TTLCache
 import uuid
-import secrets
+import base64
+import os
 import logging
+import re
+import threading
+import orjson
 
-from ..schemas.trip import TripCreate, TripUpdate, TripResponse, TripDetailResponse, InviteRequest, JoinTripResponse
+from ..schemas.trip import TripCreate, TripUpdate, TripResponse, TripDetailResponse, InviteRequest, JoinTripResponse, TripStatus as TripStatusSchema
 from pydantic import BaseModel
 from ..schemas.participant import ParticipantResponse, ParticipantRole, ParticipantStatus
-from ..services.auth import AuthService
-from ..models import Trip, Participant, User, Vote, Recommendation
+from ..services.auth import AuthService, cache_trip_access, has_cached_trip_access, invalidate_cached_trip_access
+from ..services.voting import invalidate_cached_results
+from ..models import Trip, Participant, Vote, Recommendation, User
 from ..models.trip import TripStatus
 from ..models.participant import ParticipantRole as ParticipantRoleModel, ParticipantStatus as ParticipantStatusModel
 from ..utils.database import get_db
-from ..api.auth import get_current_user
+from ..api.auth import get_current_user, get_auth_service
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/trips", tags=["trips"])
+router = APIRouter(prefix="/trips", tags=["trips"], default_response_class=ORJSONResponse)
+
+# Cheap format check for path IDs; avoids building a uuid.UUID just to validate
+_UUID_RE = re.compile(r'\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
+
+
+# Trip-list pages per (user, skip, limit, cursor). Each cached page registers its
+# user as a viewer of the trips on it, so a write to a trip evicts only the
+# pages that show it
+TRIP_LIST_CACHE_TTL_SECONDS = 45
+_trip_list_cache = TTLCache(maxsize=10000, ttl=TRIP_LIST_CACHE_TTL_SECONDS)
+_trip_list_viewers = TTLCache(maxsize=10000, ttl=TRIP_LIST_CACHE_TTL_SECONDS)
+_trip_list_cache_lock = threading.Lock()
+
+# Serialized trip details, served to callers holding a cached access grant
+# without re-checking membership; trip writes evict both
+TRIP_DETAIL_CACHE_TTL_SECONDS = 120
+_trip_detail_cache = TTLCache(maxsize=2000, ttl=TRIP_DETAIL_CACHE_TTL_SECONDS)
+_trip_detail_cache_lock = threading.Lock()
+
+# Invite codes are cut from a per-process pool of urandom bytes, refilled a
+# KiB at a time, instead of a urandom read per trip. The pool is tied to the
+# pid so forked workers never hand out the same bytes
+INVITE_CODE_BYTES = 8
+INVITE_CODE_POOL_SIZE = 1024
+_invite_code_pool = b""
+_invite_code_pool_pid = None
+_invite_code_pool_lock = threading.Lock()
+
+
+def _new_invite_code() -> str:
+    """Random URL-safe invite code, same shape as secrets.token_urlsafe(8)"""
+    global _invite_code_pool, _invite_code_pool_pid
+    with _invite_code_pool_lock:
+        if _invite_code_pool_pid != os.getpid() or len(_invite_code_pool) < INVITE_CODE_BYTES:
+            _invite_code_pool = os.urandom(INVITE_CODE_POOL_SIZE)
+            _invite_code_pool_pid = os.getpid()
+        code_bytes = _invite_code_pool[:INVITE_CODE_BYTES]
+        _invite_code_pool = _invite_code_pool[INVITE_CODE_BYTES:]
+    return base64.urlsafe_b64encode(code_bytes).rstrip(b"=").decode()
+
+
+def _trip_cache_key(trip_id) -> str:
+    """Canonical form of a trip id, whether it came from a path or a row"""
+    # Path ids have already passed _UUID_RE, so lowercasing is all it takes
+    # to match str(uuid.UUID(...)) without parsing the id again
+    return str(trip_id).lower()
+
+
+def invalidate_cached_trip_lists(trip_id=None, user_id=None) -> None:
+    """Drop cached trip-list pages that show a trip or belong to a user"""
+    with _trip_list_cache_lock:
+        user_ids = _trip_list_viewers.pop(_trip_cache_key(trip_id), set()) if trip_id else set()
+        if user_id:
+            user_ids.add(str(user_id))
+        for key in [key for key in _trip_list_cache if key[0] in user_ids]:
+            _trip_list_cache.pop(key, None)
+
+
+def invalidate_cached_trip(trip_id) -> None:
+    """Drop the cached detail and access grants for a trip"""
+    with _trip_detail_cache_lock:
+        _trip_detail_cache.pop(_trip_cache_key(trip_id), None)
+    invalidate_cached_trip_access(trip_id)
+
+
+# Rows from our own tables are already well-typed, so responses are built
+# with model_construct and skip validation; values are coerced to the exact
+# schema types so serialization stays warning-free
+def _trip_response_fields(trip) -> dict:
+    """TripResponse fields from a Trip instance"""
+    return dict(
+        id=trip.id,
+        title=trip.title,
+        description=trip.description,
+        destination=trip.destination,
+        start_date=trip.start_date,
+        end_date=trip.end_date,
+        budget_min=trip.budget_min,
+        budget_max=trip.budget_max,
+        expected_participants=trip.expected_participants,
+        invite_code=trip.invite_code,
+        status=TripStatusSchema(trip.status.value),
+        allow_member_recommendations=trip.allow_member_recommendations,
+        created_by=trip.created_by,
+        created_at=trip.created_at,
+        updated_at=trip.updated_at,
+        image_url=trip.image_url,
+        itinerary=trip.itinerary,
+        destination_images=trip.destination_images
+    )
+
+
+def _encode_trip_cursor(created_at: datetime, trip_id) -> str:
+    """Opaque keyset cursor for the trip list, pointing just past a row"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{trip_id}".encode()).decode()
+
+
+def _decode_trip_cursor(cursor: str):
+    """(created_at, id) from a trip-list cursor; ValueError if malformed"""
+    try:
+        created_at, trip_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(trip_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _dump_rows(rows: list) -> bytes:
+    """JSON for plain row dicts, matching what the response models would emit"""
+    # orjson handles UUIDs, datetimes and enums natively; OPT_UTC_Z keeps the
+    # trailing "Z" Pydantic uses for UTC timestamps
+    return orjson.dumps(rows, option=orjson.OPT_UTC_Z)
+
+
+def _trip_list_response(body: bytes, next_cursor: Optional[str]) -> Response:
+    """Trip-list page, with the cursor for the following page when there is one"""
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # DEBUG ENDPOINT
 @router.get("/{trip_id}/debug_itinerary")
@@ -46,694 +171,473 @@ def debug_itinerary(trip_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[TripResponse])
-async def get_user_trips(
-    skip: int = Query(0, ge=0),
+def get_user_trips(
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all trips for the current user"""
-    try:
-        logger.info(f"get_user_trips called for user: {current_user.id}")
-        # Get trips where user is creator or participant
-        trips_query = db.query(Trip).filter(
-            (Trip.created_by == current_user.id) |
-            (Trip.participants.any(user_id=current_user.id, status=ParticipantStatusModel.joined))
-        ).order_by(Trip.created_at.desc()).offset(skip).limit(limit)
+    """
+    Get all trips for the current user.
 
-        trips = trips_query.all()
-        return trips
+    Pages are keyset-paginated: pass the X-Next-Cursor header of one page as
+    `cursor` to fetch the next. `skip` is still honoured when no cursor is given.
+    """
+    logger.info(f"get_user_trips called for user: {current_user.id}")
 
-    except Exception as e:
-        logger.error(f"Error fetching trips: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve trips"
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = _decode_trip_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        skip = 0
+
+    # Serve the page from cache when the dashboard was loaded recently
+    cache_key = (current_user.id_str, skip, limit, cursor)
+    with _trip_list_cache_lock:
+        cached_page = _trip_list_cache.get(cache_key)
+    if cached_page is not None:
+        return _trip_list_response(*cached_page)
+
+    # Trips the user created or joined; a UNION of two indexed lookups
+    # instead of an OR across tables, which forces a sequential scan
+    trip_ids = select(Trip.id.label("id")).where(
+        Trip.created_by == current_user.id
+    ).union(
+        select(Participant.trip_id).where(
+            Participant.user_id == current_user.id,
+            Participant.status == ParticipantStatusModel.joined
+        )
+    ).cte("trip_ids")
+
+    # Joined-participant counts for just those trips, grouped once and
+    # joined in so the page needs a single round trip
+    counts_subq = db.query(
+        Participant.trip_id,
+        func.count(Participant.id).label("participant_count")
+    ).filter(
+        Participant.trip_id.in_(select(trip_ids.c.id)),
+        Participant.status == ParticipantStatusModel.joined
+    ).group_by(Participant.trip_id).subquery()
+
+    # Get trips where user is creator or participant, selecting only the
+    # response columns so rows skip ORM instance hydration
+    trips_query = db.query(
+        Trip.id, Trip.title, Trip.description, Trip.destination,
+        Trip.start_date, Trip.end_date, Trip.budget_min, Trip.budget_max,
+        Trip.expected_participants, Trip.invite_code, Trip.status,
+        Trip.allow_member_recommendations, Trip.created_by, Trip.created_at,
+        Trip.updated_at, Trip.image_url, Trip.itinerary, Trip.destination_images,
+        func.coalesce(counts_subq.c.participant_count, 0).label("participant_count")
+    ).join(
+        trip_ids, trip_ids.c.id == Trip.id
+    ).outerjoin(
+        counts_subq, counts_subq.c.trip_id == Trip.id
+    ).order_by(Trip.created_at.desc(), Trip.id.desc())
+
+    # Seek past the cursor row instead of scanning and discarding `skip` rows
+    if cursor:
+        trips_query = trips_query.filter(
+            tuple_(Trip.created_at, Trip.id) < tuple_(cursor_created_at, cursor_id)
         )
+    elif skip:
+        trips_query = trips_query.offset(skip)
+
+    # Rows go straight to JSON bytes; returning the response directly skips
+    # model construction and FastAPI's response_model pass
+    trip_rows = [row._asdict() for row in trips_query.limit(limit).all()]
+    trip_list_body = _dump_rows(trip_rows)
+
+    # A full page may have more after it
+    next_cursor = None
+    if len(trip_rows) == limit and trip_rows[-1]["created_at"] is not None:
+        next_cursor = _encode_trip_cursor(trip_rows[-1]["created_at"], trip_rows[-1]["id"])
+
+    with _trip_list_cache_lock:
+        _trip_list_cache[cache_key] = (trip_list_body, next_cursor)
+        for trip_row in trip_rows:
+            trip_key = str(trip_row["id"])
+            viewers = _trip_list_viewers.get(trip_key) or set()
+            viewers.add(cache_key[0])
+            _trip_list_viewers[trip_key] = viewers
+
+    return _trip_list_response(trip_list_body, next_cursor)
 
 
 @router.post("/", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
-async def create_trip(
+def create_trip(
     trip_data: TripCreate,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new trip"""
-    try:
-        # Validate dates
-        if trip_data.start_date and trip_data.end_date:
-            if trip_data.start_date >= trip_data.end_date:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Start date must be before end date"
-                )
-
-        # Validate budget
-        if trip_data.budget_min and trip_data.budget_max:
-            if trip_data.budget_min >= trip_data.budget_max:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Budget min must be less than budget max"
-                )
-        
-        # Create trip
-        new_trip = Trip(
-            title=trip_data.title,
-            description=trip_data.description,
-            destination=trip_data.destination,
-            start_date=trip_data.start_date,
-            end_date=trip_data.end_date,
-            budget_min=trip_data.budget_min,
-            budget_max=trip_data.budget_max,
-            expected_participants=trip_data.expected_participants,
-            created_by=current_user.id,
-            invite_code=secrets.token_urlsafe(8),
-            status=TripStatus.planning,
-            allow_member_recommendations=trip_data.allow_member_recommendations,
-            image_url=trip_data.image_url
-        )
-        
-        db.add(new_trip)
-        db.commit()
-        db.refresh(new_trip)
-
-        # Add creator as participant
-        participant = Participant(
-            trip_id=new_trip.id,
-            user_id=current_user.id,
-            role=ParticipantRoleModel.owner,
-            status=ParticipantStatusModel.joined,
-            joined_at=datetime.utcnow()
-        )
-        db.add(participant)
-        db.commit()
+    start_date, end_date = trip_data.start_date, trip_data.end_date
+    budget_min, budget_max = trip_data.budget_min, trip_data.budget_max
 
-        return new_trip
+    # Validate dates
+    if start_date and end_date and start_date >= end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before end date"
+        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error creating trip: {str(e)}")
-        db.rollback()
+    # Validate budget
+    if budget_min and budget_max and budget_min >= budget_max:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create trip"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Budget min must be less than budget max"
+        )
+
+    # Generate the id and timestamps here so the response needs no read-back
+    now = datetime.now(timezone.utc)
+    trip_values = dict(
+        id=uuid.uuid4(),
+        title=trip_data.title,
+        description=trip_data.description,
+        destination=trip_data.destination,
+        start_date=start_date,
+        end_date=end_date,
+        budget_min=budget_min,
+        budget_max=budget_max,
+        expected_participants=trip_data.expected_participants,
+        created_by=current_user.id,
+        invite_code=_new_invite_code(),
+        status=TripStatus.planning,
+        allow_member_recommendations=trip_data.allow_member_recommendations,
+        image_url=trip_data.image_url,
+        created_at=now,
+        updated_at=now
+    )
+
+    # Create trip and add creator as participant in one statement: the
+    # participant INSERT selects the id returned by the trip INSERT CTE
+    new_trip = insert(Trip).values(**trip_values).returning(Trip.id).cte("new_trip")
+    db.execute(
+        insert(Participant).from_select(
+            ["id", "trip_id", "user_id", "role", "status", "joined_at", "vote_status"],
+            select(
+                literal(uuid.uuid4(), Participant.id.type),
+                new_trip.c.id,
+                literal(current_user.id, Participant.user_id.type),
+                literal(ParticipantRoleModel.owner, Participant.role.type),
+                literal(ParticipantStatusModel.joined, Participant.status.type),
+                literal(now, Participant.joined_at.type),
+                literal("not_voted", Participant.vote_status.type)
+            )
         )
+    )
+    db.commit()
+    invalidate_cached_trip_lists(user_id=current_user.id)
+
+    return TripResponse.model_construct(**{**trip_values, "status": TripStatusSchema.planning})
 
 
 @router.get("/{trip_id}", response_model=TripDetailResponse)
-async def get_trip(
+def get_trip(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get trip details"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-
-        if not trip:
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+    trip_key = _trip_cache_key(trip_id)
+
+    # Serve from cache when this caller was recently granted access
+    with _trip_detail_cache_lock:
+        cached_detail = _trip_detail_cache.get(trip_key)
+    if cached_detail is not None and has_cached_trip_access(current_user, trip_key):
+        return cached_detail
+
+    # Get trip with its participants and their users, checking access,
+    # all in one query
+    trip = db.query(Trip).options(
+        joinedload(Trip.participants).joinedload(Participant.user), raiseload("*")
+    ).filter(
+        Trip.id == trip_id,
+        AuthService.trip_access_clause(current_user, trip_id)
+    ).first()
+
+    # No row means either no such trip or no access
+    if not trip:
+        if not db.query(Trip.id).filter(Trip.id == trip_id).first():
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Trip not found"
             )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
+        )
 
-        # Check access
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Participants validate straight from the ORM rows, user included
+    participant_responses = [
+        ParticipantResponse.model_validate(participant) for participant in trip.participants
+    ]
 
-        # Get participants
-        participants = db.query(Participant, User).join(
-            User, Participant.user_id == User.id
-        ).filter(Participant.trip_id == trip_id).all()
-
-        participant_responses = []
-        for participant, user in participants:
-            participant_response = ParticipantResponse(
-                id=str(participant.id),
-                trip_id=str(participant.trip_id),
-                user_id=str(participant.user_id),
-                role=participant.role.value,
-                status=participant.status.value,
-                invited_at=participant.invited_at,
-                joined_at=participant.joined_at,
-                user_name=user.name,
-                user_email=user.email,
-                vote_status=participant.vote_status
-            )
-            participant_responses.append(participant_response)
-
-        trip_detail = TripDetailResponse(
-            id=str(trip.id),
-            title=trip.title,
-            description=trip.description,
-            destination=trip.destination,
-            start_date=trip.start_date,
-            end_date=trip.end_date,
-            budget_min=float(trip.budget_min) if trip.budget_min else None,
-            budget_max=float(trip.budget_max) if trip.budget_max else None,
-            expected_participants=trip.expected_participants,
-            invite_code=trip.invite_code,
-            status=trip.status.value,
-            allow_member_recommendations=trip.allow_member_recommendations,
-            created_by=str(trip.created_by),
-            created_at=trip.created_at,
-            updated_at=trip.updated_at,
-            participants=participant_responses,
-            image_url=trip.image_url,
-            itinerary=trip.itinerary
-        )
+    trip_detail = TripDetailResponse.model_construct(
+        **_trip_response_fields(trip), participants=participant_responses
+    )
 
-        return trip_detail
+    cache_trip_access(current_user, trip_key)
+    with _trip_detail_cache_lock:
+        _trip_detail_cache[trip_key] = trip_detail
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting trip details: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve trip details"
-        )
+    return trip_detail
 
 
 @router.put("/{trip_id}", response_model=TripResponse)
-async def update_trip(
+def update_trip(
     trip_id: str,
     trip_update: TripUpdate,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update trip details"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+
+    # Validate dates
+    start_date, end_date = trip_update.start_date, trip_update.end_date
+    if start_date and end_date and start_date >= end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before end date"
+        )
 
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    # Update fields in one statement, scoped to the owner so no prior
+    # SELECT is needed; updated_at is always bumped by its onupdate
+    trip = db.scalars(
+        update(Trip).where(
+            Trip.id == trip_id,
+            Trip.created_by == current_user.id
+        ).values(**trip_update.model_dump(exclude_unset=True)).returning(Trip)
+    ).first()
 
-        if not trip:
+    # No row means either no such trip or not its owner
+    if not trip:
+        if not db.query(Trip.id).filter(Trip.id == trip_id).first():
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Trip not found"
             )
-
-        # Check owner access
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can update trip details"
-            )
-
-        # Validate dates
-        if trip_update.start_date and trip_update.end_date:
-            if trip_update.start_date >= trip_update.end_date:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Start date must be before end date"
-                )
-
-        # Update fields
-        for field, value in trip_update.dict(exclude_unset=True).items():
-            setattr(trip, field, value)
-            
-        db.commit()
-        db.refresh(trip)
-        return trip
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating trip: {str(e)}")
-        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update trip"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can update trip details"
         )
 
+    trip_response = TripResponse.model_construct(**_trip_response_fields(trip))
+    db.commit()
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id)
+    return trip_response
+
 
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_trip(
+def delete_trip(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    # Delete trip in one statement scoped to the owner; the database
+    # cascades to participants, preferences, recommendations and votes
+    result = db.execute(
+        delete(Trip).where(
+            Trip.id == trip_id,
+            Trip.created_by == current_user.id
+        )
+    )
 
-        if not trip:
+    # No row means either no such trip or not its owner
+    if result.rowcount == 0:
+        if not db.query(Trip.id).filter(Trip.id == trip_id).first():
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Trip not found"
             )
-
-        # Check owner access
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can delete trips"
-            )
-
-        # Delete trip (cascade will handle related records)
-        db.delete(trip)
-        db.commit()
-
-        return
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting trip: {str(e)}")
-        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete trip"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owners can delete trips"
         )
 
+    db.commit()
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id)
+
+    return
+
 
 @router.get("/{trip_id}/participants", response_model=List[ParticipantResponse])
-async def get_trip_participants(
+def get_trip_participants(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get trip participants"""
-    try:
-        # Check access
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get participants
-        participants = db.query(Participant, User).join(
-            User, Participant.user_id == User.id
-        ).filter(Participant.trip_id == trip_id).all()
-
-        participant_responses = []
-        for participant, user in participants:
-            participant_response = ParticipantResponse(
-                id=str(participant.id),
-                trip_id=str(participant.trip_id),
-                user_id=str(participant.user_id),
-                role=participant.role.value,
-                status=participant.status.value,
-                invited_at=participant.invited_at,
-                joined_at=participant.joined_at,
-                user_name=user.name,
-                user_email=user.email,
-                vote_status=participant.vote_status
-            )
-            participant_responses.append(participant_response)
-
-        return participant_responses
+    # Validate UUID
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting trip participants: {str(e)}")
+    # Get participant columns with their user's name and email in one
+    # column-only SELECT, checking access in the same query
+    participants = db.query(
+        Participant.id, Participant.trip_id, Participant.user_id,
+        Participant.role, Participant.status, Participant.invited_at,
+        Participant.joined_at, User.name.label("user_name"),
+        User.email.label("user_email"), Participant.vote_status
+    ).join(
+        User, User.id == Participant.user_id
+    ).filter(
+        Participant.trip_id == trip_id,
+        AuthService.trip_access_clause(current_user, trip_id)
+    ).all()
+    participant_rows = [participant._asdict() for participant in participants]
+
+    # No rows means either no participants left or no access
+    if not participant_rows and not AuthService(db).check_trip_access(current_user, trip_id):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve trip participants"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
+    return Response(content=_dump_rows(participant_rows), media_type="application/json")
+
 
 @router.delete("/{trip_id}/participants/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_participant(
+def remove_participant(
     trip_id: str,
     participant_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Remove a participant from a trip (or leave trip)"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(participant_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Invalid ID format"
-            )
-
-        # Get participant
-        participant = db.query(Participant).filter(
-            Participant.id == participant_id,
-            Participant.trip_id == trip_id
-        ).first()
-
-        if not participant:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Participant not found"
-            )
-
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check permissions
-        is_owner = str(trip.created_by) == str(current_user.id)
-        is_self = str(participant.user_id) == str(current_user.id)
-
-        if not (is_owner or is_self):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only remove yourself or participants from your own trips"
-            )
-
-        # If owner is leaving, we might want to warn or handle ownership transfer
-        # For now, we allow it as requested, but log it.
-        if is_owner and is_self:
-            logger.warning(f"Owner {current_user.id} is leaving trip {trip_id}")
-
-        # Remove participant
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check owner access
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can update trip details"
-            )
-
-        # Validate dates
-        if trip_update.start_date and trip_update.end_date:
-            if trip_update.start_date >= trip_update.end_date:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Start date must be before end date"
-                )
-
-        # Update fields
-        for field, value in trip_update.dict(exclude_unset=True).items():
-            setattr(trip, field, value)
-            
-        db.commit()
-        db.refresh(trip)
-        return trip
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating trip: {str(e)}")
-        db.rollback()
+    # Validate UUIDs
+    if not (_UUID_RE.match(trip_id) and _UUID_RE.match(participant_id)):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update trip"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid ID format"
         )
 
+    # Get the participant's user and the trip owner together; the foreign
+    # key guarantees the trip exists whenever the participant does
+    participant = db.query(Participant.user_id, Trip.created_by).join(
+        Trip, Trip.id == Participant.trip_id
+    ).filter(
+        Participant.id == participant_id,
+        Participant.trip_id == trip_id
+    ).first()
 
-@router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_trip(
-    trip_id: str,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Delete a trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check owner access
-        if str(trip.created_by) != str(current_user.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owners can delete trips"
-            )
-
-        # Delete trip (cascade will handle related records)
-        db.delete(trip)
-        db.commit()
-
-        return
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting trip: {str(e)}")
-        db.rollback()
+    if not participant:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete trip"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Participant not found"
         )
 
+    # Check permissions
+    is_owner = participant.created_by == current_user.id
+    is_self = participant.user_id == current_user.id
 
-@router.get("/{trip_id}/participants", response_model=List[ParticipantResponse])
-async def get_trip_participants(
-    trip_id: str,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get trip participants"""
-    try:
-        # Check access
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get participants
-        participants = db.query(Participant, User).join(
-            User, Participant.user_id == User.id
-        ).filter(Participant.trip_id == trip_id).all()
-
-        participant_responses = []
-        for participant, user in participants:
-            participant_response = ParticipantResponse(
-                id=str(participant.id),
-                trip_id=str(participant.trip_id),
-                user_id=str(participant.user_id),
-                role=participant.role.value,
-                status=participant.status.value,
-                invited_at=participant.invited_at,
-                joined_at=participant.joined_at,
-                user_name=user.name,
-                user_email=user.email
-            )
-            participant_responses.append(participant_response)
-
-        return participant_responses
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting trip participants: {str(e)}")
+    if not (is_owner or is_self):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve trip participants"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only remove yourself or participants from your own trips"
         )
 
-
-@router.delete("/{trip_id}/participants/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_participant(
-    trip_id: str,
-    participant_id: str,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Remove a participant from a trip (or leave trip)"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(participant_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Invalid ID format"
-            )
-
-        # Get participant
-        participant = db.query(Participant).filter(
-            Participant.id == participant_id,
-            Participant.trip_id == trip_id
-        ).first()
-
-        if not participant:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Participant not found"
-            )
-
-        # Get trip
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check permissions
-        is_owner = str(trip.created_by) == str(current_user.id)
-        is_self = str(participant.user_id) == str(current_user.id)
-
-        if not (is_owner or is_self):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only remove yourself or participants from your own trips"
-            )
-
-        # If owner is leaving, we might want to warn or handle ownership transfer
-        # For now, we allow it as requested, but log it.
-        if is_owner and is_self:
-            logger.warning(f"Owner {current_user.id} is leaving trip {trip_id}")
-
-        # Remove participant
-        db.delete(participant)
-        
-        # Also remove their votes
-        db.query(Vote).filter(
+    # If owner is leaving, we might want to warn or handle ownership transfer
+    # For now, we allow it as requested, but log it.
+    if is_owner and is_self:
+        logger.warning(f"Owner {current_user.id} is leaving trip {trip_id}")
+
+    # Remove participant and their votes in one statement
+    removed = delete(Participant).where(
+        Participant.id == participant_id
+    ).returning(Participant.user_id).cte("removed")
+    db.execute(
+        delete(Vote).where(
             Vote.trip_id == trip_id,
-            Vote.user_id == participant.user_id
-        ).delete()
+            Vote.user_id.in_(select(removed.c.user_id))
+        ).execution_options(synchronize_session=False)
+    )
 
-        db.commit()
-        
-        return
+    db.commit()
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id, user_id=participant.user_id)
+    invalidate_cached_results(trip_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error removing participant: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to remove participant"
-        )
+    return
 
 
 class ParticipantRoleUpdate(BaseModel):
     role: ParticipantRoleModel
 
+
 @router.patch("/{trip_id}/participants/{participant_id}", response_model=ParticipantResponse)
-async def update_participant_role(
+def update_participant_role(
     trip_id: str,
     participant_id: str,
     role_update: ParticipantRoleUpdate,
     current_user = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service),
     db: Session = Depends(get_db)
 ):
     """Update a participant's role"""
-    try:
-        # Validate UUIDs
-        try:
-            uuid.UUID(trip_id)
-            uuid.UUID(participant_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Invalid ID format"
-            )
-
-        # Check access (must be owner or admin)
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id, required_role="admin"):
-             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only admins and owners can update roles"
-            )
+    # Validate UUIDs
+    if not (_UUID_RE.match(trip_id) and _UUID_RE.match(participant_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid ID format"
+        )
 
-        # Get participant to update
-        participant = db.query(Participant).filter(
-            Participant.id == participant_id,
-            Participant.trip_id == trip_id
-        ).first()
+    # Check access (must be owner or admin)
+    if not auth_service.check_trip_access(current_user, trip_id, required_role="admin"):
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and owners can update roles"
+        )
 
-        if not participant:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Participant not found"
-            )
+    # Get participant to update
+    participant = db.query(Participant).options(
+        joinedload(Participant.user), raiseload("*")
+    ).filter(
+        Participant.id == participant_id,
+        Participant.trip_id == trip_id
+    ).first()
 
-        # Get current user's participant record to check their role level
-        current_participant = db.query(Participant).filter(
-            Participant.trip_id == trip_id,
-            Participant.user_id == current_user.id
-        ).first()
-        
-        # Determine role levels
-
-        # Get user info for response
-        user = db.query(User).filter(User.id == participant.user_id).first()
-
-        return ParticipantResponse(
-            id=str(participant.id),
-            trip_id=str(participant.trip_id),
-            user_id=str(participant.user_id),
-            role=participant.role.value,
-            status=participant.status.value,
-            invited_at=participant.invited_at,
-            joined_at=participant.joined_at,
-            user_name=user.name,
-            user_email=user.email
+    if not participant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Participant not found"
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating participant role: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update participant role"
-        )
\ No newline at end of file
+    # Get current user's participant record to check their role level
+    current_participant = db.query(Participant).filter(
+        Participant.trip_id == trip_id,
+        Participant.user_id == current_user.id
+    ).first()
+
+    # Determine role levels
+
+    return ParticipantResponse.model_validate(participant)
\ No newline at end of file
@@ -1,624 +1,406 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, delete, func, update
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple
+import re
 import uuid
+import orjson
 
 from ..schemas.vote import VoteCreate, BulkVoteCreate, VoteResponse, VotingResult, UserVoteSummary
 from ..services.auth import AuthService
-from ..services.voting import VotingService
+from ..services.voting import VotingService, invalidate_cached_results
 from ..models import Vote, Recommendation, User, Trip, Participant
 from ..models.participant import ParticipantStatus
+from ..models.trip import TripStatus
 from ..utils.database import get_db
 from ..api.auth import get_current_user
+from ..api.trips import invalidate_cached_trip, invalidate_cached_trip_lists
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/trips/{trip_id}/votes", tags=["voting"])
+router = APIRouter(prefix="/trips/{trip_id}/votes", tags=["voting"], default_response_class=ORJSONResponse)
 
+# Cheap format check for path IDs; avoids building a uuid.UUID just to validate
+_UUID_RE = re.compile(r'\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
 
-def validate_access(trip_id: str, current_user, db: Session) -> bool:
-    """Validate user has access to trip voting"""
-    try:
-        auth_service = AuthService(db)
-        return auth_service.check_trip_access(current_user, trip_id, "member")
-    except Exception:
-        return False
 
+def _user_vote_responses(db: Session, trip_id: str, user_id: uuid.UUID) -> List[VoteResponse]:
+    """A user's ballot for a trip in rank order, with destination names"""
+    # Only the response columns are selected and the rows come straight from
+    # our own tables, so responses skip ORM hydration and validation
+    user_votes = db.query(
+        Vote.id, Vote.trip_id, Vote.user_id, Vote.recommendation_id,
+        Vote.rank, Vote.created_at, Recommendation.destination_name
+    ).join(
+        Recommendation, Recommendation.id == Vote.recommendation_id
+    ).filter(
+        Vote.trip_id == trip_id,
+        Vote.user_id == user_id
+    ).order_by(Vote.rank)
 
-@router.get("", response_model=List[VoteResponse])
-async def get_trip_votes(
+    return [VoteResponse.model_construct(**vote._asdict()) for vote in user_votes]
+
+
+class TripContext(NamedTuple):
+    """What the voting endpoints need to know about the trip and the caller"""
+    trip_id: str
+    status: TripStatus
+    created_by: uuid.UUID
+    is_owner: bool
+
+
+def trip_context(
     trip_id: str,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
-):
-    """Get all votes for a trip (for transparency)"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get votes with recommendation details
-        votes = db.query(Vote, Recommendation, User).join(
-            Recommendation, Vote.recommendation_id == Recommendation.id
-        ).join(
-            User, Vote.user_id == User.id
-        ).filter(Vote.trip_id == trip_id).order_by(
-            Vote.user_id, Vote.rank
-        ).all()
-
-        vote_responses = []
-        for vote, recommendation, user in votes:
-            vote_response = VoteResponse(
-                id=str(vote.id),
-                trip_id=str(vote.trip_id),
-                user_id=str(vote.user_id),
-                recommendation_id=str(vote.recommendation_id),
-                rank=vote.rank,
-                created_at=vote.created_at,
-                destination_name=recommendation.destination_name
-            )
-            vote_responses.append(vote_response)
+) -> TripContext:
+    """
+    Validate the trip id and check member access, loading the trip's status
+    and the caller's owner access in the same query
+    """
+    if not _UUID_RE.match(trip_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
 
-        return vote_responses
+    trip = db.query(
+        Trip.status,
+        Trip.created_by,
+        AuthService.trip_access_clause(current_user, trip_id, "member").label("is_member"),
+        AuthService.trip_access_clause(current_user, trip_id, "owner").label("is_owner")
+    ).filter(Trip.id == trip_id).first()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting trip votes: {str(e)}")
+    if not trip:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve votes"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+    if not trip.is_member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this trip"
         )
 
+    return TripContext(trip_id, trip.status, trip.created_by, trip.is_owner)
+
+
+@router.get("", response_model=List[VoteResponse])
+def get_trip_votes(
+    trip_id: str,
+    ctx: TripContext = Depends(trip_context),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get all votes for a trip (for transparency)"""
+    # Get vote columns with their recommendation's name in one column-only
+    # SELECT
+    votes = db.query(
+        Vote.id, Vote.trip_id, Vote.user_id, Vote.recommendation_id,
+        Vote.rank, Vote.created_at, Recommendation.destination_name
+    ).join(
+        Recommendation, Recommendation.id == Vote.recommendation_id
+    ).filter(Vote.trip_id == trip_id).order_by(
+        Vote.user_id, Vote.rank
+    ).all()
+
+    # The plain rows are dumped straight to JSON bytes, so no ORM or
+    # response model instance is built per vote
+    vote_rows = [vote._asdict() for vote in votes]
+    return Response(
+        content=orjson.dumps(vote_rows, option=orjson.OPT_UTC_Z),
+        media_type="application/json"
+    )
+
 
 @router.post("", response_model=List[VoteResponse])
-async def cast_votes(
+def cast_votes(
     trip_id: str,
     vote_data: BulkVoteCreate,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Cast ranked-choice votes for recommendations"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Check if voting is closed
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if trip and trip.status.value == "confirmed":
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Voting is closed for this trip"
-            )
-
-        # Validate vote data format
-        vote_list = []
-        for vote_item in vote_data.votes:
-            vote_list.append({
-                "recommendation_id": vote_item.recommendation_id,
-                "rank": vote_item.rank
-            })
-
-        # Cast vote using voting service
-        voting_service = VotingService(db)
-        success = voting_service.cast_vote(
-            user_id=str(current_user.id),
-            trip_id=trip_id,
-            vote_data=vote_list
+    # Check if voting is closed
+    if ctx.status.value == "confirmed":
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Voting is closed for this trip"
         )
 
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to cast vote. Please check your vote data."
-            )
-        
-        # Check for voting completion
-        voting_service.check_voting_completion(trip_id)
-
-        # Return updated votes for this user
-        user_votes = db.query(Vote, Recommendation).join(
-            Recommendation, Vote.recommendation_id == Recommendation.id
-        ).filter(
-            Vote.trip_id == trip_id,
-            Vote.user_id == str(current_user.id)
-        ).order_by(Vote.rank).all()
-
-        vote_responses = []
-        for vote, recommendation in user_votes:
-            vote_response = VoteResponse(
-                id=str(vote.id),
-                trip_id=str(vote.trip_id),
-                user_id=str(vote.user_id),
-                recommendation_id=str(vote.recommendation_id),
-                rank=vote.rank,
-                created_at=vote.created_at,
-                destination_name=recommendation.destination_name
-            )
-            vote_responses.append(vote_response)
-
-        return vote_responses
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error casting votes: {str(e)}")
+    # Validate vote data format
+    vote_list = []
+    for vote_item in vote_data.votes:
+        vote_list.append({
+            "recommendation_id": vote_item.recommendation_id,
+            "rank": vote_item.rank
+        })
+
+    # Cast vote using voting service
+    voting_service = VotingService(db)
+    votes = voting_service.cast_vote(
+        user_id=current_user.id_str,
+        trip_id=trip_id,
+        vote_data=vote_list
+    )
+
+    if votes is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to cast votes"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to cast vote. Please check your vote data."
         )
+    invalidate_cached_trip(trip_id)
+
+    # Check for voting completion
+    voting_service.check_voting_completion(trip_id)
+
+    # Return the votes as saved by the INSERT
+    return [VoteResponse.model_construct(**vote._asdict()) for vote in votes]
 
 
 @router.post("/skip", status_code=status.HTTP_204_NO_CONTENT)
-async def skip_vote(
+def skip_vote(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Skip voting for this trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Check if voting is closed
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if trip and trip.status.value == "confirmed":
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Voting is closed for this trip"
-            )
-
-        voting_service = VotingService(db)
-        success = voting_service.skip_vote(str(current_user.id), trip_id)
-
-        if not success:
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to skip vote"
-            )
-        
-        # Check for voting completion
-        voting_service.check_voting_completion(trip_id)
+    # Check if voting is closed
+    if ctx.status.value == "confirmed":
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Voting is closed for this trip"
+        )
 
-        return
+    voting_service = VotingService(db)
+    success = voting_service.skip_vote(current_user.id_str, trip_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error skipping vote: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    if not success:
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to skip vote"
         )
+    invalidate_cached_trip(trip_id)
+
+    # Check for voting completion
+    voting_service.check_voting_completion(trip_id)
+
+    return
 
 
 @router.post("/reset", status_code=status.HTTP_204_NO_CONTENT)
-async def reset_votes(
+def reset_votes(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Reset all votes for this trip (Owner only)"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access - MUST be owner
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id, "owner"):
-             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owner can reset votes"
-            )
-
-        voting_service = VotingService(db)
-        success = voting_service.reset_votes(trip_id)
-
-        if not success:
-             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to reset votes"
-            )
+    # Check access - MUST be owner
+    if not ctx.is_owner:
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owner can reset votes"
+        )
 
-        return
+    voting_service = VotingService(db)
+    success = voting_service.reset_votes(trip_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error resetting votes: {str(e)}")
-        raise HTTPException(
+    if not success:
+         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to reset votes"
         )
 
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id)
+    return
+
 
 @router.post("/finalize", response_model=VotingResult)
 async def finalize_voting(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Finalize voting and generate results (Owner only)"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Check access - MUST be owner
+    if not ctx.is_owner:
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owner can finalize voting"
+        )
 
-        # Check access - MUST be owner
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id, "owner"):
-             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owner can finalize voting"
-            )
+    voting_service = VotingService(db)
 
-        voting_service = VotingService(db)
-        
-        # Check if voting is complete
-        if not voting_service.check_voting_completion(trip_id):
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot finalize voting until all participants have voted or skipped"
-            )
-
-        results = await voting_service.finalize_voting(trip_id)
+    # Check if voting is complete
+    if not await run_in_threadpool(voting_service.check_voting_completion, trip_id):
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot finalize voting until all participants have voted or skipped"
+        )
 
-        return VotingResult(**results)
+    results = await voting_service.finalize_voting(trip_id)
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error finalizing voting: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to finalize voting"
-        )
+    return VotingResult(**results)
 
 
 @router.get("/results", response_model=VotingResult)
-async def get_voting_results(
+def get_voting_results(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get instant-runoff voting results"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Check if results are available (trip is confirmed) OR user is owner
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if not trip:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        is_owner = str(trip.created_by) == str(current_user.id)
-        
-        # If not decided yet, check restrictions
-        if trip.status.value != "confirmed":
-            # If owner, only allow if voting is complete (all participants voted)
-            if is_owner:
-                voting_service = VotingService(db)
-                if not voting_service.check_voting_completion(trip_id):
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Voting results are not available until all participants have voted"
-                    )
-            # If not owner, deny access
-            else:
-                 raise HTTPException(
+    # Results are available once the trip is confirmed, or to the owner
+    # once everyone has voted
+    if ctx.status.value != "confirmed":
+        # If owner, only allow if voting is complete (all participants voted)
+        if ctx.is_owner:
+            voting_service = VotingService(db)
+            if not voting_service.check_voting_completion(trip_id):
+                raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Voting results are not yet finalized"
+                    detail="Voting results are not available until all participants have voted"
                 )
+        # If not owner, deny access
+        else:
+             raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Voting results are not yet finalized"
+            )
 
-        # Calculate results using voting service
-        voting_service = VotingService(db)
-        results = voting_service.calculate_results(trip_id)
+    # Calculate results using voting service; a confirmed trip's tally is
+    # final, so it can be served from cache for longer
+    voting_service = VotingService(db)
+    results = voting_service.cached_results(trip_id, final=ctx.status.value == "confirmed")
 
-        return VotingResult(**results)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting voting results: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to calculate voting results"
-        )
+    return VotingResult(**results)
 
 
 @router.get("/my-votes", response_model=List[VoteResponse])
-async def get_my_votes(
+def get_my_votes(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's votes for this trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get user's votes
-        user_votes = db.query(Vote, Recommendation).join(
-            Recommendation, Vote.recommendation_id == Recommendation.id
-        ).filter(
-            Vote.trip_id == trip_id,
-            Vote.user_id == str(current_user.id)
-        ).order_by(Vote.rank).all()
-
-        vote_responses = []
-        for vote, recommendation in user_votes:
-            vote_response = VoteResponse(
-                id=str(vote.id),
-                trip_id=str(vote.trip_id),
-                user_id=str(vote.user_id),
-                recommendation_id=str(vote.recommendation_id),
-                rank=vote.rank,
-                created_at=vote.created_at,
-                destination_name=recommendation.destination_name
-            )
-            vote_responses.append(vote_response)
-
-        return vote_responses
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting user votes: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve user votes"
-        )
+    # Get user's votes
+    return _user_vote_responses(db, trip_id, current_user.id)
 
 
 @router.get("/summary", response_model=List[UserVoteSummary])
-async def get_voting_summary(
+def get_voting_summary(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get summary of who has voted in the trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
-
-        # Get all participants who have joined
-        participants = db.query(Participant, User).join(
-            User, Participant.user_id == User.id
-        ).filter(
-            Participant.trip_id == trip_id,
-            Participant.status == ParticipantStatus.joined
-        ).all()
-
-        # Get vote counts for each participant
-        vote_summaries = []
-        for participant, user in participants:
-            vote_count = db.query(Vote).filter(
-                Vote.trip_id == trip_id,
-                Vote.user_id == str(user.id)
-            ).count()
-
-            # Check if they skipped
-            has_skipped = participant.vote_status == "skipped"
-            has_voted = vote_count > 0 or has_skipped
-
-            vote_summary = UserVoteSummary(
-                user_id=str(user.id),
-                user_name=user.name,
-                has_voted=has_voted,
-                vote_count=vote_count
-            )
-            vote_summaries.append(vote_summary)
-
-        return vote_summaries
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting voting summary: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve voting summary"
+    # Get all participants who have joined with their vote counts, grouped
+    # in one query instead of a COUNT per participant
+    participants = db.query(
+        User.id, User.name, Participant.vote_status,
+        func.count(Vote.id).label("vote_count")
+    ).select_from(Participant).join(
+        User, Participant.user_id == User.id
+    ).outerjoin(
+        Vote, and_(Vote.user_id == User.id, Vote.trip_id == trip_id)
+    ).filter(
+        Participant.trip_id == trip_id,
+        Participant.status == ParticipantStatus.joined
+    ).group_by(Participant.id, User.id, User.name, Participant.vote_status).all()
+
+    vote_summaries = []
+    for user_id, user_name, vote_status, vote_count in participants:
+        # Check if they skipped
+        has_skipped = vote_status == "skipped"
+        has_voted = vote_count > 0 or has_skipped
+
+        vote_summary = UserVoteSummary(
+            user_id=user_id,
+            user_name=user_name,
+            has_voted=has_voted,
+            vote_count=vote_count
         )
+        vote_summaries.append(vote_summary)
+
+    return vote_summaries
 
 
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
-async def withdraw_votes(
+def withdraw_votes(
     trip_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Withdraw all current user's votes for this trip"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
+    # Check if voting is closed
+    if ctx.status.value == "confirmed":
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Voting is closed for this trip"
+        )
 
-        # Check access
-        if not validate_access(trip_id, current_user, db):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this trip"
-            )
+    # Delete user's votes
+    deleted_count = db.execute(
+        delete(Vote)
+        .where(Vote.trip_id == trip_id, Vote.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
 
-        # Check if voting is closed
-        trip = db.query(Trip).filter(Trip.id == trip_id).first()
-        if trip and trip.status.value == "confirmed":
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Voting is closed for this trip"
-            )
+    # Reset participant status
+    db.execute(
+        update(Participant)
+        .where(Participant.trip_id == trip_id, Participant.user_id == current_user.id)
+        .values(vote_status="not_voted")
+        .execution_options(synchronize_session=False)
+    )
 
-        # Delete user's votes
-        deleted_count = db.query(Vote).filter(
-            Vote.trip_id == trip_id,
-            Vote.user_id == str(current_user.id)
-        ).delete()
-
-        # Reset participant status
-        participant = db.query(Participant).filter(
-            Participant.trip_id == trip_id,
-            Participant.user_id == current_user.id
-        ).first()
-        
-        if participant:
-            participant.vote_status = "not_voted"
-
-        db.commit()
-        logger.info(f"User {current_user.id} withdrew {deleted_count} votes from trip {trip_id}")
-
-        return
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error withdrawing votes: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to withdraw votes"
-        )
+    db.commit()
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_results(trip_id)
+    logger.info(f"User {current_user.id} withdrew {deleted_count} votes from trip {trip_id}")
+
+    return
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def reset_user_vote(
+def reset_user_vote(
     trip_id: str,
     user_id: str,
+    ctx: TripContext = Depends(trip_context),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Reset votes for a specific user (Owner only)"""
-    try:
-        # Validate UUID
-        try:
-            uuid.UUID(trip_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trip not found"
-            )
-
-        # Check access - MUST be owner
-        auth_service = AuthService(db)
-        if not auth_service.check_trip_access(current_user, trip_id, "owner"):
-             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only trip owner can reset user votes"
-            )
-
-        voting_service = VotingService(db)
-        success = voting_service.reset_user_vote(trip_id, user_id)
-
-        if not success:
-             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to reset user vote"
-            )
+    # Check access - MUST be owner
+    if not ctx.is_owner:
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trip owner can reset user votes"
+        )
 
-        return
+    voting_service = VotingService(db)
+    success = voting_service.reset_user_vote(trip_id, user_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error resetting user vote: {str(e)}")
-        db.rollback()
-        raise HTTPException(
+    if not success:
+         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to reset user vote"
-        )
\ No newline at end of file
+        )
+
+    invalidate_cached_trip(trip_id)
+    invalidate_cached_trip_lists(trip_id=trip_id)
+    return
\ No newline at end of file
@@ -1,12 +1,18 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+import asyncio
 import logging
 import sys
 from sqlalchemy import text
+from anyio.to_thread import current_default_thread_limiter
+from starlette.concurrency import run_in_threadpool
 
 from .config import settings
-from .utils.database import engine, Base
+from .utils.database import engine, Base, DB_POOL_SIZE, DB_MAX_OVERFLOW, warm_up_pool
+from .services.telegram_bot import TelegramBotService, TELEGRAM_UPDATE_QUEUE_SIZE
 from .api import auth_router, trips_router, votes_router, recommendations_router, telegram_router, preferences_router, join_trip_router
 
 # Configure logging
@@ -28,6 +34,7 @@ app = FastAPI(
     description="AI-assisted group trip planner with ranked-choice voting",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -39,6 +46,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the web client read the trip-list pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -52,11 +61,26 @@ app.include_router(preferences_router)
 app.include_router(join_trip_router)
 
 
+# Malformed UUIDs in the path can never match a row, so report them as 404
+# like the handlers that still validate IDs themselves
+@app.exception_handler(RequestValidationError)
+async def path_uuid_exception_handler(request, exc):
+    for error in exc.errors():
+        loc = error.get("loc", ())
+        if len(loc) == 2 and loc[0] == "path" and error.get("type", "").startswith("uuid"):
+            resource = str(loc[1]).removesuffix("_id").replace("_", " ").capitalize()
+            return ORJSONResponse(
+                status_code=404,
+                content={"detail": f"{resource} not found"}
+            )
+    return await request_validation_exception_handler(request, exc)
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "message": "An unexpected error occurred"}
     )
@@ -76,6 +100,21 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Application startup event"""
+    # Sync endpoints run in this threadpool; size it to the DB pool so every
+    # worker thread can get a connection without waiting on the pool
+    current_default_thread_limiter().total_tokens = DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+    # Build the bot application once and share it across requests
+    app.state.telegram_bot_service = TelegramBotService()
+
+    # Webhook requests only enqueue updates; a single worker runs the handlers
+    app.state.telegram_update_queue = asyncio.Queue(maxsize=TELEGRAM_UPDATE_QUEUE_SIZE)
+    app.state.telegram_update_worker = None
+    if app.state.telegram_bot_service.application:
+        app.state.telegram_update_worker = asyncio.create_task(
+            app.state.telegram_bot_service.process_updates(app.state.telegram_update_queue)
+        )
+
     try:
         #Base.metadata.drop_all(bind=engine) # Temporarily enabled to fix schema
         Base.metadata.create_all(bind=engine)
@@ -110,14 +149,149 @@ async def startup_event():
                 logger.info("Added itinerary and destination_images columns")
         except Exception as e:
             logger.info(f"Migration note (itinerary/images): {e}")
+
+        # Manual migration for preference upserts (ON CONFLICT target). Survey
+        # completion fails without the constraint, so duplicate rows are
+        # dropped first (keeping the newest) and a failure is logged as an error
+        try:
+            with engine.connect() as conn:
+                has_constraint = conn.execute(text(
+                    "SELECT 1 FROM pg_constraint WHERE conname = 'unique_user_trip_preference'"
+                )).scalar()
+                if not has_constraint:
+                    removed = conn.execute(text(
+                        "DELETE FROM preferences WHERE id IN ("
+                        "SELECT id FROM (SELECT id, row_number() OVER ("
+                        "PARTITION BY trip_id, user_id, preference_type "
+                        "ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id"
+                        ") AS rn FROM preferences) ranked WHERE rn > 1)"
+                    )).rowcount
+                    conn.execute(text("ALTER TABLE preferences ADD CONSTRAINT unique_user_trip_preference UNIQUE (trip_id, user_id, preference_type)"))
+                    conn.commit()
+                    logger.info(f"Added unique_user_trip_preference constraint (removed {removed} duplicate preferences)")
+        except Exception as e:
+            logger.error(f"Migration failed (unique_user_trip_preference): {e}")
+
+        # Manual migration for DB-side preference timestamps
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE preferences ALTER COLUMN updated_at SET DEFAULT now()"))
+                conn.commit()
+                logger.info("Set preferences.updated_at default")
+        except Exception as e:
+            logger.info(f"Migration note (preferences.updated_at): {e}")
+
+        # Manual migration for DB-side user timestamps
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE users ALTER COLUMN updated_at SET DEFAULT now()"))
+                conn.commit()
+                logger.info("Set users.updated_at default")
+        except Exception as e:
+            logger.info(f"Migration note (users.updated_at): {e}")
+
+        # Manual migration for join upserts (ON CONFLICT target). Joining fails
+        # without the constraint, so duplicate memberships are dropped first
+        # (keeping the owner or joined row) and a failure is logged as an error
+        try:
+            with engine.connect() as conn:
+                has_constraint = conn.execute(text(
+                    "SELECT 1 FROM pg_constraint WHERE conname = 'unique_trip_participant'"
+                )).scalar()
+                if not has_constraint:
+                    removed = conn.execute(text(
+                        "DELETE FROM participants WHERE id IN ("
+                        "SELECT id FROM (SELECT id, row_number() OVER ("
+                        "PARTITION BY trip_id, user_id "
+                        "ORDER BY role = 'owner' DESC, status = 'joined' DESC, joined_at NULLS LAST, invited_at, id"
+                        ") AS rn FROM participants) ranked WHERE rn > 1)"
+                    )).rowcount
+                    conn.execute(text("ALTER TABLE participants ADD CONSTRAINT unique_trip_participant UNIQUE (trip_id, user_id)"))
+                    conn.commit()
+                    logger.info(f"Added unique_trip_participant constraint (removed {removed} duplicate participants)")
+        except Exception as e:
+            logger.error(f"Migration failed (unique_trip_participant): {e}")
+
+        # Manual migration for cascading vote deletes with their recommendation
+        try:
+            with engine.connect() as conn:
+                delete_rule = conn.execute(text(
+                    "SELECT confdeltype FROM pg_constraint WHERE conname = 'votes_recommendation_id_fkey'"
+                )).scalar()
+                if delete_rule != "c":
+                    conn.execute(text("ALTER TABLE votes DROP CONSTRAINT IF EXISTS votes_recommendation_id_fkey"))
+                    conn.execute(text("ALTER TABLE votes ADD CONSTRAINT votes_recommendation_id_fkey FOREIGN KEY (recommendation_id) REFERENCES recommendations(id) ON DELETE CASCADE"))
+                    conn.commit()
+                    logger.info("Set ON DELETE CASCADE on votes.recommendation_id")
+        except Exception as e:
+            logger.error(f"Migration failed (votes_recommendation_id_fkey): {e}")
+
+        # Manual migration for cascading trip deletes to their child rows
+        try:
+            with engine.connect() as conn:
+                for table in ("participants", "preferences", "recommendations", "votes"):
+                    delete_rule = conn.execute(text(
+                        f"SELECT confdeltype FROM pg_constraint WHERE conname = '{table}_trip_id_fkey'"
+                    )).scalar()
+                    if delete_rule != "c":
+                        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_trip_id_fkey"))
+                        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_trip_id_fkey FOREIGN KEY (trip_id) REFERENCES trips(id) ON DELETE CASCADE"))
+                        logger.info(f"Set ON DELETE CASCADE on {table}.trip_id")
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Migration failed (trip_id foreign keys): {e}")
+
+        # Manual migration for indexes on the recommendation clear/cascade paths
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_rec_trip_ai ON recommendations (trip_id) WHERE ai_generated"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_votes_recommendation_id ON votes (recommendation_id)"))
+                conn.commit()
+                logger.info("Ensured ix_rec_trip_ai and ix_votes_recommendation_id indexes")
+        except Exception as e:
+            logger.info(f"Migration note (recommendation indexes): {e}")
+
+        # Manual migration for indexes on the trip list filters
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trip_created_by_created_at ON trips (created_by, created_at DESC)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_participants_trip_status ON participants (trip_id, status)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_participants_user_status ON participants (user_id, status)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_participants_trip_user_status ON participants (trip_id, user_id, status)"))
+                conn.commit()
+                logger.info("Ensured trip list indexes")
+        except Exception as e:
+            logger.info(f"Migration note (trip list indexes): {e}")
+
+        # Manual migration for the rank-ordered ballot index
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_votes_trip_user_rank ON votes (trip_id, user_id, rank)"))
+                conn.commit()
+                logger.info("Ensured ix_votes_trip_user_rank index")
+        except Exception as e:
+            logger.info(f"Migration note (vote indexes): {e}")
             
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
 
+    # Pre-open pooled connections off the event loop
+    try:
+        await run_in_threadpool(warm_up_pool)
+        logger.info("Database connection pool warmed up")
+    except Exception as e:
+        logger.warning(f"Database pool warm-up failed: {str(e)}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
+    if app.state.telegram_update_worker:
+        app.state.telegram_update_worker.cancel()
+        try:
+            await app.state.telegram_update_worker
+        except asyncio.CancelledError:
+            pass
     logger.info("Application shutting down")
 
 
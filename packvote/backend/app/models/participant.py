@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -25,7 +25,7 @@ class Participant(Base):
     __tablename__ = "participants"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     role = Column(Enum(ParticipantRole), default=ParticipantRole.member)
     status = Column(Enum(ParticipantStatus), default=ParticipantStatus.invited)
@@ -37,5 +37,15 @@ class Participant(Base):
     trip = relationship("Trip", back_populates="participants")
     user = relationship("User", back_populates="trip_participations")
 
+    # Constraints and indexes
+    __table_args__ = (
+        UniqueConstraint('trip_id', 'user_id', name='unique_trip_participant'),
+        # Joined-member counts per trip and trip lookups per member
+        Index('ix_participants_trip_status', 'trip_id', 'status'),
+        Index('ix_participants_user_status', 'user_id', 'status'),
+        # Covers membership checks (trip, user, joined?) without a heap fetch
+        Index('ix_participants_trip_user_status', 'trip_id', 'user_id', 'status'),
+    )
+
     def __repr__(self):
         return f"<Participant(id={self.id}, trip_id={self.trip_id}, user_id={self.user_id}, role={self.role})>"
\ No newline at end of file
@@ -1,13 +1,14 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Enum, UniqueConstraint, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
 import uuid
 import enum
 
 # This 'Base' is likely imported from a shared database setup file.
 # Assuming it's in a file like 'app/utils/database.py' as per your import.
 from ..utils.database import Base
+from .user import User
 
 
 class PreferenceType(enum.Enum):
@@ -24,7 +25,7 @@ class Preference(Base):
     __tablename__ = "preferences"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     
     # Corrected line: Use the 'Enum' imported from 'sqlalchemy'
@@ -32,11 +33,27 @@ class Preference(Base):
     
     preference_data = Column(JSON, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Author's name as a correlated subquery; deferred so it is only
+    # selected by queries that ask for it with undefer()
+    user_name = column_property(
+        select(User.name).where(User.id == user_id).scalar_subquery(),
+        deferred=True
+    )
 
     # Relationships
     trip = relationship("Trip", back_populates="preferences")
     user = relationship("User", back_populates="preferences")
 
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('trip_id', 'user_id', 'preference_type', name='unique_user_trip_preference'),
+    )
+
+    # Fetch server-generated timestamps via RETURNING on INSERT and UPDATE
+    # so write paths never need a follow-up refresh
+    __mapper_args__ = {"eager_defaults": True}
+
     def __repr__(self):
         return f"<Preference(id={self.id}, type={self.preference_type}, user_id={self.user_id})>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Numeric, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Text, Numeric, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -11,7 +11,7 @@ class Recommendation(Base):
     __tablename__ = "recommendations"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     destination_name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     estimated_cost = Column(Numeric(10, 2), nullable=True)
@@ -28,7 +28,13 @@ class Recommendation(Base):
 
     # Relationships
     trip = relationship("Trip", back_populates="recommendations")
-    votes = relationship("Vote", back_populates="recommendation", cascade="all, delete-orphan")
+    votes = relationship("Vote", back_populates="recommendation", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Indexes
+    __table_args__ = (
+        # Regenerating a trip clears only its AI recommendations
+        Index('ix_rec_trip_ai', 'trip_id', postgresql_where=ai_generated),
+    )
 
     def __repr__(self):
         return f"<Recommendation(id={self.id}, destination={self.destination_name}, ai_generated={self.ai_generated})>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Numeric, Enum, ForeignKey, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, Text, Numeric, Enum, ForeignKey, Integer, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -24,10 +24,13 @@ class Trip(Base):
     destination = Column(String(255), nullable=True)
     start_date = Column(DateTime(timezone=True), nullable=True)
     end_date = Column(DateTime(timezone=True), nullable=True)
-    budget_min = Column(Numeric(10, 2), nullable=True)
-    budget_max = Column(Numeric(10, 2), nullable=True)
+    # Budgets only feed JSON responses, so hand them back as floats
+    budget_min = Column(Numeric(10, 2, asdecimal=False), nullable=True)
+    budget_max = Column(Numeric(10, 2, asdecimal=False), nullable=True)
     expected_participants = Column(Integer, nullable=True)
-    invite_code = Column(String(255), unique=True, nullable=True)
+    # Unique, so a join by code can never resolve to the wrong trip; a code
+    # collision fails the trip INSERT instead
+    invite_code = Column(String(255), unique=True, index=True, nullable=True)
     status = Column(Enum(TripStatus), default=TripStatus.planning, nullable=False)
     allow_member_recommendations = Column(Boolean, default=False)
     image_url = Column(String(500), nullable=True)
@@ -40,10 +43,16 @@ class Trip(Base):
 
     # Relationships
     created_by_user = relationship("User", back_populates="created_trips")
-    participants = relationship("Participant", back_populates="trip", cascade="all, delete-orphan")
-    preferences = relationship("Preference", back_populates="trip", cascade="all, delete-orphan")
-    recommendations = relationship("Recommendation", back_populates="trip", cascade="all, delete-orphan")
-    votes = relationship("Vote", back_populates="trip", cascade="all, delete-orphan")
+    participants = relationship("Participant", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True)
+    preferences = relationship("Preference", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True)
+    recommendations = relationship("Recommendation", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True)
+    votes = relationship("Vote", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Indexes
+    __table_args__ = (
+        # Trip list filters by creator and pages newest first
+        Index('ix_trip_created_by_created_at', created_by, created_at.desc()),
+    )
 
     def __repr__(self):
         return f"<Trip(id={self.id}, title={self.title}, status={self.status})>"
\ No newline at end of file
@@ -2,6 +2,7 @@ from sqlalchemy import Column, String, DateTime, Boolean
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from functools import cached_property
 import uuid
 
 from ..utils.database import Base
@@ -19,7 +20,7 @@ class User(Base):
     preferred_currency = Column(String(3), default="USD", server_default="USD", nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
     # Relationships
     created_trips = relationship("Trip", back_populates="created_by_user")
@@ -27,5 +28,13 @@ class User(Base):
     preferences = relationship("Preference", back_populates="user")
     votes = relationship("Vote", back_populates="user")
 
+    # Fetch server-generated columns with RETURNING on INSERT/UPDATE
+    __mapper_args__ = {"eager_defaults": True}
+
+    @cached_property
+    def id_str(self) -> str:
+        """String form of id, built once per instance for keys and comparisons"""
+        return str(self.id)
+
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, name={self.name})>"
\ No newline at end of file
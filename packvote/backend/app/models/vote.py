@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -11,9 +11,9 @@ class Vote(Base):
     __tablename__ = "votes"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id"), nullable=False)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    recommendation_id = Column(UUID(as_uuid=True), ForeignKey("recommendations.id"), nullable=False)
+    recommendation_id = Column(UUID(as_uuid=True), ForeignKey("recommendations.id", ondelete="CASCADE"), nullable=False, index=True)
     rank = Column(Integer, nullable=False)  # 1=first choice, 2=second choice, etc.
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -22,9 +22,11 @@ class Vote(Base):
     user = relationship("User", back_populates="votes")
     recommendation = relationship("Recommendation", back_populates="votes")
 
-    # Constraints
+    # Constraints and indexes
     __table_args__ = (
         UniqueConstraint('trip_id', 'user_id', 'recommendation_id', name='unique_user_trip_recommendation_vote'),
+        # Ballots are listed per trip (and voter) in rank order
+        Index('ix_votes_trip_user_rank', 'trip_id', 'user_id', 'rank'),
     )
 
     def __repr__(self):
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices, AliasPath
 from typing import Optional
 from datetime import datetime
 from enum import Enum
+from uuid import UUID
 
 
 class ParticipantRole(str, Enum):
@@ -18,16 +19,18 @@ class ParticipantStatus(str, Enum):
 
 
 class ParticipantResponse(BaseModel):
-    id: str
-    trip_id: str
-    user_id: str
+    id: UUID
+    trip_id: UUID
+    user_id: UUID
     role: ParticipantRole
     status: ParticipantStatus
     invited_at: Optional[datetime] = None
     joined_at: Optional[datetime] = None
-    user_name: Optional[str] = None
-    user_email: Optional[str] = None
+    # Read from the participant's loaded user when validating an ORM row
+    user_name: Optional[str] = Field(None, validation_alias=AliasChoices("user_name", AliasPath("user", "name")))
+    user_email: Optional[str] = Field(None, validation_alias=AliasChoices("user_email", AliasPath("user", "email")))
     vote_status: Optional[str] = "not_voted"
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+        populate_by_name = True
\ No newline at end of file
@@ -1,7 +1,8 @@
 from typing import List, Dict, Optional, Any
 from enum import Enum
 from datetime import datetime
-from pydantic import BaseModel, Field
+from uuid import UUID
+from pydantic import BaseModel, Field, field_validator
 
 class PreferenceType(str, Enum):
     BUDGET = "budget"
@@ -20,15 +21,24 @@ class PreferenceUpdate(BaseModel):
     preference_data: Optional[Dict[str, Any]] = None
 
 class PreferenceResponse(BaseModel):
-    id: str
-    trip_id: str
-    user_id: str
+    id: UUID
+    trip_id: UUID
+    user_id: UUID
     preference_type: str
     preference_data: Dict[str, Any]
     created_at: datetime
     updated_at: Optional[datetime] = None
     user_name: Optional[str] = None
 
+    @field_validator('preference_type', mode='before')
+    @classmethod
+    def unwrap_preference_type(cls, value: Any) -> Any:
+        # ORM rows carry the model-side enum; expose its string value
+        return getattr(value, 'value', value)
+
+    class Config:
+        from_attributes = True
+
 class SurveyResponse(BaseModel):
     trip_id: str
     user_preferences: List[PreferenceResponse]
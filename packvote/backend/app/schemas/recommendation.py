@@ -1,6 +1,18 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationInfo, model_validator
 from typing import Optional, List
 from datetime import datetime
+from uuid import UUID
+
+
+def personalization_from_meta(meta: Optional[dict], user_id: Optional[str]) -> Optional[dict]:
+    """Return the personalization stored in a recommendation's meta for a user"""
+    return ((meta or {}).get("personalizations") or {}).get(user_id)
+
+
+def transportation_options_from_meta(meta: Optional[dict]) -> List[str]:
+    """Return the transport options stored in a recommendation's meta"""
+    return (meta or {}).get("transportation_options", [])
+
 
 class RecommendationCreate(BaseModel):
     destination_name: str = Field(..., min_length=1, max_length=255)
@@ -23,8 +35,8 @@ class RecommendationUpdate(BaseModel):
 
 
 class RecommendationResponse(BaseModel):
-    id: str
-    trip_id: str
+    id: UUID
+    trip_id: UUID
     destination_name: str
     description: Optional[str] = None
     estimated_cost: Optional[float] = None
@@ -38,6 +50,15 @@ class RecommendationResponse(BaseModel):
     meta: Optional[dict] = None
     personalization: Optional[dict] = None
 
+    @model_validator(mode='after')
+    def resolve_from_meta(self, info: ValidationInfo) -> 'RecommendationResponse':
+        # ORM rows keep transport options and per-user personalizations in meta
+        if self.transportation_options is None:
+            self.transportation_options = transportation_options_from_meta(self.meta)
+        if self.personalization is None and info.context:
+            self.personalization = personalization_from_meta(self.meta, info.context.get("user_id"))
+        return self
+
     class Config:
         from_attributes = True
 
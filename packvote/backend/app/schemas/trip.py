@@ -60,6 +60,7 @@ class TripResponse(BaseModel):
     image_url: Optional[str] = None
     itinerary: Optional[List[Dict[str, Any]]] = None
     destination_images: Optional[List[str]] = None
+    participant_count: Optional[int] = None
 
     class Config:
         from_attributes = True
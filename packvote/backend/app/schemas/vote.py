@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from uuid import UUID
 
 
 class VoteCreate(BaseModel):
@@ -13,10 +14,10 @@ class BulkVoteCreate(BaseModel):
 
 
 class VoteResponse(BaseModel):
-    id: str
-    trip_id: str
-    user_id: str
-    recommendation_id: str
+    id: UUID
+    trip_id: UUID
+    user_id: UUID
+    recommendation_id: UUID
     rank: int
     created_at: Optional[datetime] = None
     destination_name: Optional[str] = None
@@ -25,7 +26,7 @@ class VoteResponse(BaseModel):
         from_attributes = True
 
 class UserVoteSummary(BaseModel):
-    user_id: str
+    user_id: UUID
     user_name: str
     has_voted: bool
     vote_count: int
@@ -1,5 +1,7 @@
 from typing import List, Dict, Any, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import json
@@ -67,16 +69,19 @@ class AIService:
                 self._log_debug("AI service not available (self.model is None)")
                 return await self._generate_fallback_recommendations(trip_id)
 
+            # Queries and Gemini calls are blocking, so they run in the
+            # threadpool rather than on the event loop
+
             # Get trip details
-            trip = self.db.query(Trip).filter(Trip.id == trip_id).first()
+            trip = await run_in_threadpool(self.db.query(Trip).filter(Trip.id == trip_id).first)
             if not trip:
                 raise Exception("Trip not found")
 
             # Get all preferences for this trip
-            preferences = self.db.query(Preference).filter(Preference.trip_id == trip_id).all()
+            preferences = await run_in_threadpool(self.db.query(Preference).filter(Preference.trip_id == trip_id).all)
 
             # Get participants and their details
-            participants = self.db.query(User).join(Participant).filter(Participant.trip_id == trip_id).all()
+            participants = await run_in_threadpool(self.db.query(User).join(Participant).filter(Participant.trip_id == trip_id).all)
             participants_data = []
             for p in participants:
                 participants_data.append({
@@ -108,7 +113,8 @@ class AIService:
                 self._log_debug(f"FULL PROMPT:\n{prompt}") 
                 self._log_debug("="*50)
 
-                response = self.model.generate_content(
+                response = await run_in_threadpool(
+                    self.model.generate_content,
                     prompt,
                     generation_config=genai.types.GenerationConfig(
                         temperature=0.7,
@@ -191,7 +197,7 @@ class AIService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = await run_in_threadpool(self.model.generate_content, prompt)
             text = response.text
             
             # Extract JSON
@@ -403,7 +409,7 @@ IMPORTANT: Return RAW JSON only. Do not use Markdown code blocks. Do not include
 
     async def _create_recommendations_from_ai(self, trip_id: str, recommendations_data: List[Any]) -> List[Recommendation]:
         """Create Recommendation objects from AI response data"""
-        created_recommendations = []
+        recommendation_rows = []
 
         try:
             for rec_data in recommendations_data:
@@ -425,9 +431,10 @@ IMPORTANT: Return RAW JSON only. Do not use Markdown code blocks. Do not include
                 elif "₹" in cost_str or "INR" in cost_str:
                     currency_code = "INR"
 
-                recommendation = Recommendation(
+                destination_name = rec_dict.get("destination") or rec_dict.get("location") or "Unknown Destination"
+                recommendation_rows.append(dict(
                     trip_id=trip_id,
-                    destination_name=rec_dict.get("destination") or rec_dict.get("location") or "Unknown Destination",
+                    destination_name=destination_name,
                     description=rec_dict.get("description", ""),
                     estimated_cost=self._parse_cost(cost_str),
                     activities=rec_dict.get("activities", [])[:10],
@@ -446,22 +453,25 @@ IMPORTANT: Return RAW JSON only. Do not use Markdown code blocks. Do not include
                         "itinerary": rec_dict.get("itinerary", []),
                         "dining_recommendations": rec_dict.get("dining_recommendations", [])
                     },
-                    ai_generated=True
-                )
-
-                # Fetch image from Unsplash
-                image_url = await unsplash_service.get_photo_url(recommendation.destination_name)
-                if image_url:
-                    recommendation.image_url = image_url
-
-
-                self.db.add(recommendation)
-                created_recommendations.append(recommendation)
-
-            self.db.commit()
-
-            for rec in created_recommendations:
-                self.db.refresh(rec)
+                    ai_generated=True,
+                    # Fetch image from Unsplash
+                    image_url=await unsplash_service.get_photo_url(destination_name)
+                ))
+
+            if not recommendation_rows:
+                return []
+
+            # One multi-row INSERT ... RETURNING instead of a flush and a
+            # refresh SELECT per recommendation
+            def insert_recommendations():
+                created = self.db.scalars(
+                    insert(Recommendation).returning(Recommendation),
+                    recommendation_rows
+                ).all()
+                self.db.commit()
+                return created
+
+            created_recommendations = await run_in_threadpool(insert_recommendations)
 
             logger.info(f"Created {len(created_recommendations)} AI recommendations for trip {trip_id}")
             return created_recommendations
@@ -1,27 +1,62 @@
 import bcrypt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from sqlalchemy import or_
+from sqlalchemy import or_, exists
+from cachetools import TTLCache
 
 from ..models import User, Participant, Trip
-from ..models.participant import ParticipantStatus
+from ..models.participant import ParticipantRole, ParticipantStatus
 from ..utils.security import (
     create_access_token,
     verify_token
 )
 from ..config import settings
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Role hierarchy: owner > admin > member > viewer
+ROLE_HIERARCHY = {"viewer": 1, "member": 2, "admin": 3, "owner": 4}
+
+# Trip access granted recently, shared by every router. Only grants are
+# cached so a user who just joined is never locked out; removing a member,
+# changing a role or deleting a trip must call invalidate_cached_trip_access
+TRIP_ACCESS_CACHE_TTL_SECONDS = 60
+_trip_access_grants = TTLCache(maxsize=50000, ttl=TRIP_ACCESS_CACHE_TTL_SECONDS)
+_trip_access_grants_lock = threading.Lock()
+
+
+def has_cached_trip_access(user: User, trip_id, required_role: str = "member") -> bool:
+    """Whether the user was recently granted this level of access to the trip"""
+    with _trip_access_grants_lock:
+        return (str(trip_id).lower(), user.id_str, required_role) in _trip_access_grants
+
+
+def cache_trip_access(user: User, trip_id, required_role: str = "member") -> None:
+    """Remember that the user has this level of access to the trip"""
+    with _trip_access_grants_lock:
+        _trip_access_grants[(str(trip_id).lower(), user.id_str, required_role)] = True
+
+
+def invalidate_cached_trip_access(trip_id) -> None:
+    """Drop every cached access grant for a trip"""
+    trip_key = str(trip_id).lower()
+    with _trip_access_grants_lock:
+        for key in [key for key in _trip_access_grants if key[0] == trip_key]:
+            _trip_access_grants.pop(key, None)
+
 
 class AuthService:
     """Service for handling user authentication and authorization"""
 
     def __init__(self, db: Session):
         self.db = db
+        # Access decisions made through this instance, keyed by
+        # (user_id, trip_id, required_role); one instance lives for one request
+        self._access_cache: Dict[Tuple[str, str, str], bool] = {}
 
     def register_user(self, email: str, name: str, password: str, location: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -54,9 +89,12 @@ class AuthService:
                 is_active=True
             )
 
+            # Flush to get server defaults back from the INSERT, then detach so
+            # the commit does not expire them and force a re-SELECT
             self.db.add(new_user)
+            self.db.flush()
+            self.db.expunge(new_user)
             self.db.commit()
-            self.db.refresh(new_user)
 
             # Generate access token
             access_token_expires = timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
@@ -198,34 +236,51 @@ class AuthService:
         """
         Check if user has access to a trip with required role
         """
-        try:
-            # Check if user is trip owner (creator)
-            trip = self.db.query(Trip).filter(Trip.id == trip_id).first()
-            if trip and str(trip.created_by) == str(user.id):
-                return True
-
-            # Check participant status
-            participant = self.db.query(Participant).filter(
-                Participant.trip_id == trip_id,
-                Participant.user_id == user.id,
-                Participant.status == ParticipantStatus.joined
-            ).first()
-
-            if not participant:
-                return False
-
-            # Role hierarchy: owner > member > viewer
-            # Role hierarchy: owner > admin > member > viewer
-            role_hierarchy = {"viewer": 1, "member": 2, "admin": 3, "owner": 4}
-            user_role_level = role_hierarchy.get(participant.role.value, 0)
-            required_role_level = role_hierarchy.get(required_role, 0)
-
-            return user_role_level >= required_role_level
+        cache_key = (str(user.id), str(trip_id).lower(), required_role)
+        if cache_key in self._access_cache:
+            return self._access_cache[cache_key]
+        if has_cached_trip_access(user, trip_id, required_role):
+            return True
 
+        try:
+            # Owner and participant role checks in a single query
+            has_access = bool(self.db.query(
+                self.trip_access_clause(user, trip_id, required_role)
+            ).scalar())
         except Exception as e:
             logger.error(f"Error checking trip access: {str(e)}")
             return False
 
+        self._access_cache[cache_key] = has_access
+        if has_access:
+            cache_trip_access(user, trip_id, required_role)
+        return has_access
+
+    @staticmethod
+    def trip_access_clause(user: User, trip_id: str, required_role: str = "member"):
+        """
+        SQL expression equivalent to check_trip_access, for folding the access
+        check into another query instead of issuing separate lookups. Needs no
+        session, so callers use it without constructing the service
+        """
+        required_role_level = ROLE_HIERARCHY.get(required_role, 0)
+        allowed_roles = [
+            role for role in ParticipantRole
+            if ROLE_HIERARCHY.get(role.value, 0) >= required_role_level
+        ]
+
+        is_owner = exists().where(
+            Trip.id == trip_id,
+            Trip.created_by == user.id
+        )
+        is_participant = exists().where(
+            Participant.trip_id == trip_id,
+            Participant.user_id == user.id,
+            Participant.status == ParticipantStatus.joined,
+            Participant.role.in_(allowed_roles)
+        )
+        return or_(is_owner, is_participant)
+
     def update_user_profile(self, user_id: str, name: Optional[str] = None, telegram_id: Optional[str] = None, location: Optional[str] = None, preferred_currency: Optional[str] = None) -> User:
         """
         Update user profile information
@@ -264,8 +319,11 @@ class AuthService:
 
             user.updated_at = datetime.utcnow()
 
+            # Detach before committing so the returned user keeps its loaded
+            # values instead of re-SELECTing them after the commit
+            self.db.flush()
+            self.db.expunge(user)
             self.db.commit()
-            self.db.refresh(user)
 
             return user
 
@@ -1,8 +1,9 @@
 import logging
 from typing import Dict, Any, Optional, List
-from sqlalchemy.orm import Session
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, distinct, func
 import asyncio
 
 from ..models import User, Trip, Participant, Preference
@@ -13,15 +14,20 @@ from ..schemas.preference import (
     PreferenceType
 )
 from ..config import settings
+from ..utils.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Webhook updates waiting for the worker; Telegram retries when we refuse one
+TELEGRAM_UPDATE_QUEUE_SIZE = 1000
+
 
 class TelegramBotService:
     """Service for handling Telegram bot interactions and surveys"""
 
-    def __init__(self, db: Session):
-        self.db = db
+    # One instance is shared app-wide; bot updates arrive outside any API
+    # request, so DB lookups open their own short-lived session
+    def __init__(self):
         self.application = None
         self._initialize_bot()
 
@@ -113,7 +119,7 @@ Need help? Contact your trip organizer.
 
             # Link user to Telegram ID
             telegram_id = str(update.effective_user.id)
-            user = self._get_or_link_user(telegram_id, update.effective_user.username)
+            user = await run_in_threadpool(self._get_or_link_user, telegram_id, update.effective_user.username)
 
             if not user:
                 await update.message.reply_text(
@@ -123,7 +129,7 @@ Need help? Contact your trip organizer.
                 return
 
             # Validate trip access
-            if not self._validate_trip_access(user.id, trip_id):
+            if not await run_in_threadpool(self._validate_trip_access, user.id, trip_id):
                 await update.message.reply_text(
                     "❌ You don't have access to this trip or the trip doesn't exist. "
                     "Please check the trip ID with your organizer."
@@ -141,7 +147,7 @@ Need help? Contact your trip organizer.
         """Handle /status command"""
         try:
             telegram_id = str(update.effective_user.id)
-            user = self._get_or_link_user(telegram_id, update.effective_user.username)
+            user = await run_in_threadpool(self._get_or_link_user, telegram_id, update.effective_user.username)
 
             if not user:
                 await update.message.reply_text(
@@ -150,7 +156,7 @@ Need help? Contact your trip organizer.
                 return
 
             # Get user's trips and survey status
-            trips_status = self._get_user_trips_status(user.id)
+            trips_status = await run_in_threadpool(self._get_user_trips_status, user.id)
 
             if not trips_status:
                 await update.message.reply_text(
@@ -200,9 +206,9 @@ Need help? Contact your trip organizer.
 
             # Verify user
             telegram_id = str(update.effective_user.id)
-            user = self._get_user_by_telegram_id(telegram_id)
+            user = await run_in_threadpool(self._get_user_by_telegram_id, telegram_id)
 
-            if not user or str(user.id) != user_id:
+            if not user or user.id_str != user_id:
                 await query.edit_message_text("❌ Invalid user access")
                 return
 
@@ -232,7 +238,7 @@ Need help? Contact your trip organizer.
             telegram_id = str(update.effective_user.id)
 
             # Check if user is in the middle of a survey
-            user = self._get_user_by_telegram_id(telegram_id)
+            user = await run_in_threadpool(self._get_user_by_telegram_id, telegram_id)
             if not user:
                 return
 
@@ -246,7 +252,8 @@ Need help? Contact your trip organizer.
         """Get or link user by Telegram ID"""
         try:
             # First try to find user by Telegram ID
-            user = self.db.query(User).filter(User.telegram_id == telegram_id).first()
+            with SessionLocal() as db:
+                user = db.query(User).filter(User.telegram_id == telegram_id).first()
             if user:
                 return user
 
@@ -261,7 +268,8 @@ Need help? Contact your trip organizer.
     def _get_user_by_telegram_id(self, telegram_id: str) -> Optional[User]:
         """Get user by Telegram ID"""
         try:
-            return self.db.query(User).filter(User.telegram_id == telegram_id).first()
+            with SessionLocal() as db:
+                return db.query(User).filter(User.telegram_id == telegram_id).first()
         except Exception as e:
             logger.error(f"Error getting user by Telegram ID: {str(e)}")
             return None
@@ -269,26 +277,31 @@ Need help? Contact your trip organizer.
     def _validate_trip_access(self, user_id: str, trip_id: str) -> bool:
         """Validate user has access to trip"""
         try:
-            participant = self.db.query(Participant).filter(
-                Participant.trip_id == trip_id,
-                Participant.user_id == user_id,
-                Participant.status == ParticipantStatus.joined
-            ).first()
+            with SessionLocal() as db:
+                participant = db.query(Participant).filter(
+                    Participant.trip_id == trip_id,
+                    Participant.user_id == user_id,
+                    Participant.status == ParticipantStatus.joined
+                ).first()
             return participant is not None
         except Exception as e:
             logger.error(f"Error validating trip access: {str(e)}")
             return False
 
-    async def _start_survey(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str, trip_id: str):
-        """Start the preference survey"""
-        try:
-            # Check if user already has survey data
-            existing_preferences = self.db.query(Preference).filter(
+    def _get_completed_preference_types(self, user_id: str, trip_id: str) -> set:
+        """Preference types the user has already answered for a trip"""
+        with SessionLocal() as db:
+            preference_types = db.query(Preference.preference_type).filter(
                 Preference.trip_id == trip_id,
                 Preference.user_id == user_id
             ).all()
+        return {preference_type.value for preference_type, in preference_types}
 
-            existing_types = {pref.preference_type.value for pref in existing_preferences}
+    async def _start_survey(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str, trip_id: str):
+        """Start the preference survey"""
+        try:
+            # Check if user already has survey data
+            existing_types = await run_in_threadpool(self._get_completed_preference_types, user_id, trip_id)
 
             # Create welcome message
             keyboard = [
@@ -438,32 +451,32 @@ Use /status anytime to check your progress on other trips.
     def _get_user_trips_status(self, user_id: str) -> List[Dict[str, Any]]:
         """Get survey status for all user's trips"""
         try:
-            # Get trips where user is a participant
-            trips = self.db.query(Trip, Participant).join(
-                Participant, Trip.id == Participant.trip_id
-            ).filter(
-                Participant.user_id == user_id,
-                Participant.status == ParticipantStatus.joined
-            ).all()
-
-            trips_status = []
-            for trip, participant in trips:
-                # Get completed preference sections
-                preferences = self.db.query(Preference).filter(
-                    Preference.trip_id == trip.id,
-                    Preference.user_id == user_id
-                ).all()
+            with SessionLocal() as db:
+                # Trips where user is a participant, with their completed
+                # preference sections counted in the same query
+                trips = db.query(
+                    Trip.id,
+                    Trip.title,
+                    func.count(distinct(Preference.preference_type))
+                ).join(
+                    Participant, Trip.id == Participant.trip_id
+                ).outerjoin(
+                    Preference, and_(Preference.trip_id == Trip.id, Preference.user_id == user_id)
+                ).filter(
+                    Participant.user_id == user_id,
+                    Participant.status == ParticipantStatus.joined
+                ).group_by(Trip.id, Trip.title).all()
 
-                completed_types = {pref.preference_type.value for pref in preferences}
                 total_sections = len(PreferenceType)
-                completed_sections = len(completed_types)
-
-                trips_status.append({
-                    "trip_id": str(trip.id),
-                    "trip_title": trip.title,
-                    "completed_sections": completed_sections,
-                    "total_sections": total_sections
-                })
+                trips_status = [
+                    {
+                        "trip_id": str(trip_id),
+                        "trip_title": trip_title,
+                        "completed_sections": completed_sections,
+                        "total_sections": total_sections
+                    }
+                    for trip_id, trip_title, completed_sections in trips
+                ]
 
             return trips_status
 
@@ -527,6 +540,27 @@ Voting ensures everyone's preferences are heard fairly.
             logger.error(f"Error sending voting notification: {str(e)}")
             return False
 
+    async def process_updates(self, queue: asyncio.Queue):
+        """Dispatch queued webhook updates to the bot handlers, one at a time"""
+        try:
+            await self.application.initialize()
+        except Exception as e:
+            logger.error(f"Error initializing Telegram application: {str(e)}")
+            return
+
+        try:
+            while True:
+                webhook_data = await queue.get()
+                try:
+                    update = Update.de_json(webhook_data, self.application.bot)
+                    await self.application.process_update(update)
+                except Exception as e:
+                    logger.error(f"Error processing Telegram update: {str(e)}")
+                finally:
+                    queue.task_done()
+        finally:
+            await self.application.shutdown()
+
     def run_bot(self):
         """Start the bot (for development/testing)"""
         if self.application:
@@ -535,4 +569,7 @@ Voting ensures everyone's preferences are heard fairly.
     def setup_webhook(self):
         """Setup webhook for production deployment"""
         if self.application and settings.TELEGRAM_WEBHOOK_URL:
-            self.application.bot.set_webhook(settings.TELEGRAM_WEBHOOK_URL)
\ No newline at end of file
+            self.application.bot.set_webhook(
+                settings.TELEGRAM_WEBHOOK_URL,
+                secret_token=settings.TELEGRAM_WEBHOOK_SECRET
+            )
\ No newline at end of file
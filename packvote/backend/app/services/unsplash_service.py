@@ -1,17 +1,27 @@
 import httpx
 from typing import Optional
+from cachetools import TTLCache
 from ..config import settings
 
+# Destination photos rarely change; popular names repeat across trips
+PHOTO_URL_CACHE_TTL_SECONDS = 24 * 60 * 60
+
 class UnsplashService:
     def __init__(self):
         self.access_key = settings.UNSPLASH_ACCESS_KEY
         self.base_url = "https://api.unsplash.com"
+        self._photo_url_cache = TTLCache(maxsize=2048, ttl=PHOTO_URL_CACHE_TTL_SECONDS)
 
     async def get_photo_url(self, query: str) -> Optional[str]:
         if not self.access_key:
             print("Warning: UNSPLASH_ACCESS_KEY not found")
             return None
 
+        cache_key = " ".join(query.lower().split())
+        cached_url = self._photo_url_cache.get(cache_key)
+        if cached_url:
+            return cached_url
+
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.get(
@@ -30,7 +40,9 @@ class UnsplashService:
                     data = response.json()
                     if data["results"]:
                         # Return the regular sized image URL
-                        return data["results"][0]["urls"]["regular"]
+                        photo_url = data["results"][0]["urls"]["regular"]
+                        self._photo_url_cache[cache_key] = photo_url
+                        return photo_url
                 
                 return None
         except Exception as e:
@@ -1,12 +1,35 @@
 from typing import List, Dict, Optional, Tuple, NamedTuple
+from sqlalchemy import and_, delete, exists, insert, or_, select, update
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from ..models import Vote, Recommendation, User, Trip, Participant
 from ..models.participant import ParticipantStatus
+from ..models.trip import TripStatus
 from .unsplash_service import unsplash_service
+from cachetools import TTLCache
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Tallied results per trip. Open trips are cached briefly to absorb results
+# polling; a confirmed trip's tally only changes through writes that evict
+# it, so it is kept for a day. Anything that changes a trip's votes or
+# candidates must call invalidate_cached_results
+VOTING_RESULTS_CACHE_TTL_SECONDS = 15
+FINAL_VOTING_RESULTS_CACHE_TTL_SECONDS = 86400
+_results_cache = TTLCache(maxsize=1000, ttl=VOTING_RESULTS_CACHE_TTL_SECONDS)
+_final_results_cache = TTLCache(maxsize=1000, ttl=FINAL_VOTING_RESULTS_CACHE_TTL_SECONDS)
+_results_cache_lock = threading.Lock()
+
+
+def invalidate_cached_results(trip_id) -> None:
+    """Drop the cached voting results for a trip"""
+    trip_key = str(trip_id).lower()
+    with _results_cache_lock:
+        _results_cache.pop(trip_key, None)
+        _final_results_cache.pop(trip_key, None)
+
 # Borda Count Voting Implementation
 class Candidate:
     def __init__(self, id: str, destination_name: str, description: str = "", estimated_cost: float = 0.0):
@@ -72,20 +95,9 @@ def calculate_borda_count(candidates: List[Candidate], ballots: List[Ballot]) ->
     if not scores:
         return None, {}
         
-    # Sort scores: Primary key = score (desc), Secondary key = cost (asc)
-    # We use a tuple for sorting: (score, -cost) if we want both desc, but cost needs to be asc.
-    # So we can sort by score desc, then cost asc.
-    # Python's sort is stable, so we can sort by cost first, then by score.
-    
-    # First sort by cost (ascending) - cheaper is better
-    sorted_by_cost = sorted(scores.items(), key=lambda x: candidate_map[x[0]].estimated_cost)
-    
-    # Then sort by score (descending) - higher is better
-    # Since sort is stable, candidates with equal scores will remain sorted by cost
-    sorted_scores = sorted(sorted_by_cost, key=lambda x: x[1], reverse=True)
-    
-    # Get winner ID
-    winner_id = sorted_scores[0][0]
+    # Highest score wins; among equal scores the cheaper candidate wins. max()
+    # keeps the first of any remaining exact ties, in candidate order.
+    winner_id = max(scores, key=lambda cid: (scores[cid], -candidate_map[cid].estimated_cost))
     winner = candidate_map.get(winner_id)
     
     return winner, scores
@@ -108,10 +120,10 @@ class VotingService:
             Dict containing voting results with winner and scores
         """
         try:
-            # Get all votes for this trip
-            votes = self.db.query(Vote).filter(Vote.trip_id == trip_id).all()
+            # Candidates and ballots come back in one round trip
+            candidates, user_ballots = self._load_vote_matrix(trip_id)
 
-            if not votes:
+            if not user_ballots:
                 return {
                     "winner": None,
                     "scores": {},
@@ -119,30 +131,8 @@ class VotingService:
                     "message": "No votes cast yet"
                 }
 
-            # Get unique voters
-            unique_voters = len(set(v.user_id for v in votes))
-
-            # Group votes by user and create ballots
-            user_ballots = self._create_ballots(votes)
-
-            if not user_ballots:
-                return {
-                    "winner": None,
-                    "scores": {},
-                    "total_voters": unique_voters,
-                    "message": "No valid ballots found"
-                }
-
-            # Get all candidates (recommendations)
-            candidates = self._get_candidates(trip_id)
-
-            if not candidates:
-                return {
-                    "winner": None,
-                    "scores": {},
-                    "total_voters": unique_voters,
-                    "message": "No candidates available"
-                }
+            # Every voter has exactly one ballot
+            unique_voters = len(user_ballots)
 
             # Run Borda Count voting
             winner, scores = calculate_borda_count(candidates, user_ballots)
@@ -163,47 +153,61 @@ class VotingService:
             logger.error(f"Error calculating voting results for trip {trip_id}: {str(e)}")
             raise
 
-    def _create_ballots(self, votes: List[Vote]) -> List[Ballot]:
-        """Convert votes to Ballot objects"""
-        user_votes = {}
-
-        # Group votes by user
-        for vote in votes:
-            if vote.user_id not in user_votes:
-                user_votes[vote.user_id] = []
-            user_votes[vote.user_id].append(vote)
-
-        ballots = []
-        for user_id, user_vote_list in user_votes.items():
-            # Sort by rank (1=first choice)
-            sorted_votes = sorted(user_vote_list, key=lambda v: v.rank)
-
-            # Create ranking list of candidate IDs
-            ranking = [str(vote.recommendation_id) for vote in sorted_votes]
+    def cached_results(self, trip_id: str, final: bool = False) -> Dict:
+        """
+        calculate_results, served from cache while the trip's votes are unchanged
 
-            if ranking:  # Only create ballot if user has ranked candidates
-                ballot = Ballot(ranking)
-                ballots.append(ballot)
+        Args:
+            trip_id: UUID of the trip
+            final: whether the trip is confirmed, so the tally can be kept longer
+        """
+        trip_key = str(trip_id).lower()
+        cache = _final_results_cache if final else _results_cache
+        with _results_cache_lock:
+            results = cache.get(trip_key)
+        if results is None:
+            results = self.calculate_results(trip_id)
+            with _results_cache_lock:
+                cache[trip_key] = results
+        return results
+
+    def _load_vote_matrix(self, trip_id: str) -> Tuple[List[Candidate], List[Ballot]]:
+        """Load the trip's candidates and each voter's ranked ballot in one query"""
+        rows = self.db.query(
+            Recommendation.id,
+            Recommendation.destination_name,
+            Recommendation.description,
+            Recommendation.estimated_cost,
+            Vote.user_id,
+            Vote.rank
+        ).outerjoin(
+            Vote, and_(Vote.recommendation_id == Recommendation.id, Vote.trip_id == trip_id)
+        ).filter(
+            Recommendation.trip_id == trip_id
+        ).order_by(Recommendation.created_at, Recommendation.id).all()
 
-        return ballots
+        candidates = {}
+        user_votes = {}
+        for row in rows:
+            rec_id = str(row.id)
+            if rec_id not in candidates:
+                candidates[rec_id] = Candidate(
+                    id=rec_id,
+                    destination_name=row.destination_name,
+                    description=row.description or "",
+                    estimated_cost=float(row.estimated_cost) if row.estimated_cost else 0.0
+                )
+            # Recommendations nobody ranked come back once with no vote
+            if row.user_id is not None:
+                user_votes.setdefault(row.user_id, []).append((row.rank, rec_id))
 
-    def _get_candidates(self, trip_id: str) -> List[Candidate]:
-        """Get all recommendations as candidates for the trip"""
-        recommendations = self.db.query(Recommendation).filter(
-            Recommendation.trip_id == trip_id
-        ).all()
-
-        candidates = []
-        for rec in recommendations:
-            candidate = Candidate(
-                id=str(rec.id),
-                destination_name=rec.destination_name,
-                description=rec.description or "",
-                estimated_cost=float(rec.estimated_cost) if rec.estimated_cost else 0.0
-            )
-            candidates.append(candidate)
+        # Sort each voter's choices by rank (1=first choice)
+        ballots = [
+            Ballot([rec_id for _, rec_id in sorted(ranked)])
+            for ranked in user_votes.values()
+        ]
 
-        return candidates
+        return list(candidates.values()), ballots
 
     def validate_vote(self, user_id: str, trip_id: str, vote_data: List[Dict]) -> bool:
         """
@@ -248,13 +252,17 @@ class VotingService:
             logger.error(f"Error validating vote: {str(e)}")
             return False
 
-    def cast_vote(self, user_id: str, trip_id: str, vote_data: List[Dict]) -> bool:
+    def cast_vote(self, user_id: str, trip_id: str, vote_data: List[Dict]) -> Optional[List]:
         """
         Cast a vote for a user in a trip
+
+        Returns:
+            The saved vote rows in rank order, with destination names, or
+            None if the vote was rejected
         """
         try:
             if not self.validate_vote(user_id, trip_id, vote_data):
-                return False
+                return None
 
             # Delete any existing votes for this user in this trip (in case)
             self.db.query(Vote).filter(
@@ -262,32 +270,42 @@ class VotingService:
                 Vote.trip_id == trip_id
             ).delete()
 
-            # Create new votes
-            for vote_item in vote_data:
-                vote = Vote(
-                    trip_id=trip_id,
-                    user_id=user_id,
-                    recommendation_id=vote_item["recommendation_id"],
-                    rank=vote_item["rank"]
-                )
-                self.db.add(vote)
+            # Create new votes in one multi-row INSERT, reading them back
+            # with their destination names in the same statement
+            inserted_votes = insert(Vote).values([
+                {
+                    "trip_id": trip_id,
+                    "user_id": user_id,
+                    "recommendation_id": vote_item["recommendation_id"],
+                    "rank": vote_item["rank"]
+                }
+                for vote_item in vote_data
+            ]).returning(
+                Vote.id, Vote.trip_id, Vote.user_id, Vote.recommendation_id,
+                Vote.rank, Vote.created_at
+            ).cte("inserted_votes")
+            votes = self.db.execute(
+                select(inserted_votes, Recommendation.destination_name).join(
+                    Recommendation, Recommendation.id == inserted_votes.c.recommendation_id
+                ).order_by(inserted_votes.c.rank)
+            ).all()
 
             # Update participant vote status
-            participant = self.db.query(Participant).filter(
-                Participant.trip_id == trip_id,
-                Participant.user_id == user_id
-            ).first()
-            
-            if participant:
-                participant.vote_status = "voted"
+            self.db.execute(
+                update(Participant)
+                .where(Participant.trip_id == trip_id, Participant.user_id == user_id)
+                .values(vote_status="voted")
+                .execution_options(synchronize_session=False)
+            )
 
             self.db.commit()
-            return True
+            invalidate_cached_results(trip_id)
+            return votes
 
         except Exception as e:
             logger.error(f"Error casting vote: {str(e)}")
             self.db.rollback()
-            return False
+            return None
 
     def skip_vote(self, user_id: str, trip_id: str) -> bool:
         """
@@ -295,21 +313,25 @@ class VotingService:
         """
         try:
             # Delete any existing votes
-            self.db.query(Vote).filter(
-                Vote.user_id == user_id,
-                Vote.trip_id == trip_id
-            ).delete()
+            self.db.execute(
+                delete(Vote)
+                .where(Vote.user_id == user_id, Vote.trip_id == trip_id)
+                .execution_options(synchronize_session=False)
+            )
 
             # Update participant status
-            participant = self.db.query(Participant).filter(
-                Participant.trip_id == trip_id,
-                Participant.user_id == user_id
-            ).first()
-
-            if participant:
-                participant.vote_status = "skipped"
+            skipped = self.db.execute(
+                update(Participant)
+                .where(Participant.trip_id == trip_id, Participant.user_id == user_id)
+                .values(vote_status="skipped")
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+            if skipped:
                 self.db.commit()
+                invalidate_cached_results(trip_id)
                 return True
+            self.db.rollback()
             return False
         except Exception as e:
             logger.error(f"Error skipping vote: {str(e)}")
@@ -322,23 +344,27 @@ class VotingService:
         If so, calculate results and update trip status.
         """
         try:
-            # Get all joined participants
-            participants = self.db.query(Participant).filter(
+            joined = and_(
                 Participant.trip_id == trip_id,
                 Participant.status == ParticipantStatus.joined
-            ).all()
-
-            if not participants:
-                return False
+            )
 
-            # Check if everyone has voted or skipped
-            all_done = all(p.vote_status in ["voted", "skipped"] for p in participants)
+            # Complete means there are joined participants and none of them
+            # is still to vote; EXISTS stops at the first matching row
+            # instead of loading every participant
+            has_participants, has_pending = self.db.query(
+                exists().where(joined),
+                exists().where(
+                    joined,
+                    or_(
+                        Participant.vote_status.is_(None),
+                        Participant.vote_status.not_in(["voted", "skipped"])
+                    )
+                )
+            ).one()
 
-            if all_done:
-                # Just return True to indicate voting is complete, but don't change status
-                return True
-            
-            return False
+            # Just return True to indicate voting is complete, but don't change status
+            return has_participants and not has_pending
 
         except Exception as e:
             logger.error(f"Error checking voting completion: {str(e)}")
@@ -350,19 +376,21 @@ class VotingService:
         """
         try:
             # Calculate results to find winner
-            results = self.calculate_results(trip_id)
+            results = await run_in_threadpool(self.calculate_results, trip_id)
             winner = results.get("winner")
 
-            trip = self.db.query(Trip).filter(Trip.id == trip_id).first()
+            trip = await run_in_threadpool(self.db.query(Trip).filter(Trip.id == trip_id).first)
             if trip:
                 trip.status = "confirmed" # Using confirmed as "Decided"
                 if winner:
                     trip.destination = winner["destination_name"]
                     
                     # Get the winning recommendation to copy itinerary
-                    winning_rec = self.db.query(Recommendation).filter(
-                        Recommendation.id == winner["id"]
-                    ).first()
+                    winning_rec = await run_in_threadpool(
+                        self.db.query(Recommendation).filter(
+                            Recommendation.id == winner["id"]
+                        ).first
+                    )
                     
                     if winning_rec and winning_rec.meta:
                         logger.info(f"Winning recommendation meta keys: {winning_rec.meta.keys()}")
@@ -383,14 +411,17 @@ class VotingService:
                         if images:
                             trip.image_url = images[0]
 
-                self.db.commit()
-                logger.info(f"Trip {trip_id} finalized. Status: {trip.status}, Destination: {trip.destination}")
+                # Read these before commit expires them; a reload would block the loop
+                trip_status, trip_destination = trip.status, trip.destination
+                await run_in_threadpool(self.db.commit)
+                invalidate_cached_results(trip_id)
+                logger.info(f"Trip {trip_id} finalized. Status: {trip_status}, Destination: {trip_destination}")
             
             return results
 
         except Exception as e:
             logger.error(f"Error finalizing voting: {str(e)}")
-            self.db.rollback()
+            await run_in_threadpool(self.db.rollback)
             raise
 
     def reset_votes(self, trip_id: str) -> bool:
@@ -399,23 +430,37 @@ class VotingService:
         """
         try:
             # Delete all votes
-            self.db.query(Vote).filter(Vote.trip_id == trip_id).delete()
+            self.db.execute(
+                delete(Vote)
+                .where(Vote.trip_id == trip_id)
+                .execution_options(synchronize_session=False)
+            )
 
             # Reset participant statuses
-            self.db.query(Participant).filter(
-                Participant.trip_id == trip_id
-            ).update({"vote_status": "not_voted"})
+            self.db.execute(
+                update(Participant)
+                .where(Participant.trip_id == trip_id)
+                .values(vote_status="not_voted")
+                .execution_options(synchronize_session=False)
+            )
+
+            # Reset trip status (voting rather than planning, since we are
+            # revoting) and clear the decided destination
+            self.db.execute(
+                update(Trip)
+                .where(Trip.id == trip_id)
+                .values(
+                    status=TripStatus.voting,
+                    destination=None,
+                    itinerary=None,
+                    destination_images=None,
+                    image_url=None
+                )
+                .execution_options(synchronize_session=False)
+            )
 
-            # Reset trip status
-            trip = self.db.query(Trip).filter(Trip.id == trip_id).first()
-            if trip:
-                trip.status = "voting" # Or planning, but voting makes sense if we are revoting
-                trip.destination = None # Clear destination
-                trip.itinerary = None
-                trip.destination_images = None
-                trip.image_url = None
-            
             self.db.commit()
+            invalidate_cached_results(trip_id)
             return True
         except Exception as e:
             logger.error(f"Error resetting votes: {str(e)}")
@@ -428,31 +473,38 @@ class VotingService:
         """
         try:
             # Delete user's votes
-            self.db.query(Vote).filter(
-                Vote.trip_id == trip_id,
-                Vote.user_id == user_id
-            ).delete()
+            self.db.execute(
+                delete(Vote)
+                .where(Vote.trip_id == trip_id, Vote.user_id == user_id)
+                .execution_options(synchronize_session=False)
+            )
 
             # Reset participant status
-            participant = self.db.query(Participant).filter(
-                Participant.trip_id == trip_id,
-                Participant.user_id == user_id
-            ).first()
-            
-            if participant:
-                participant.vote_status = "not_voted"
-
-            # Check if trip was confirmed, if so, reset to voting
-            trip = self.db.query(Trip).filter(Trip.id == trip_id).first()
-            if trip and trip.status.value == "confirmed":
-                trip.status = "voting"
-                trip.destination = None
-                trip.itinerary = None
-                trip.destination_images = None
-                trip.image_url = None
+            self.db.execute(
+                update(Participant)
+                .where(Participant.trip_id == trip_id, Participant.user_id == user_id)
+                .values(vote_status="not_voted")
+                .execution_options(synchronize_session=False)
+            )
+
+            # If the trip was confirmed, reset it to voting
+            reopened = self.db.execute(
+                update(Trip)
+                .where(Trip.id == trip_id, Trip.status == TripStatus.confirmed)
+                .values(
+                    status=TripStatus.voting,
+                    destination=None,
+                    itinerary=None,
+                    destination_images=None,
+                    image_url=None
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if reopened:
                 logger.info(f"Trip {trip_id} status reset to voting due to user {user_id} vote reset")
 
             self.db.commit()
+            invalidate_cached_results(trip_id)
             return True
         except Exception as e:
             logger.error(f"Error resetting user vote: {str(e)}")
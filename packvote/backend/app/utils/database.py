@@ -1,24 +1,51 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 import os
 from ..config import settings
 
 # Database configuration
 DATABASE_URL = settings.DATABASE_URL
 
+# Connection pool sizing; the API threadpool is capped at the same total
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 40
+
+# Sync endpoints run on FastAPI's threadpool, so each request needs its own
+# pooled connection rather than one connection shared across threads
+pool_options = {} if "sqlite" in DATABASE_URL else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    # Recycle before managed Postgres / proxies drop idle connections
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
+# Our queries are short OLTP lookups, where JIT compilation only adds latency
+connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {
+    "options": "-c jit=off",
+}
+
+# Connections opened at startup so the first requests skip connection setup
+DB_POOL_WARMUP = 5
+
 # Create engine
 engine = create_engine(
     DATABASE_URL,
-    poolclass=StaticPool,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=os.getenv("DEBUG", "false").lower() == "true"
+    connect_args=connect_args,
+    echo=os.getenv("DEBUG", "false").lower() == "true",
+    **pool_options
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def warm_up_pool(count: int = DB_POOL_WARMUP) -> None:
+    """Open connections up front and return them to the pool"""
+    connections = [engine.connect() for _ in range(min(count, DB_POOL_SIZE))]
+    for connection in connections:
+        connection.close()
+
 # Create Base class
 Base = declarative_base()
 